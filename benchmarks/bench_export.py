@@ -0,0 +1,61 @@
+"""Throughput and peak memory of streaming exports and the online backup.
+
+Seeds a large exercise_table (10M rows by default), then runs every export format and
+a backup in its own process, so each reports its own peak RSS. Seeding 10M rows takes a
+minute or two and about 400 MB of disk.
+
+Run from the repository root: python -m benchmarks.bench_export
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.common import seed_db
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs inside the child process; prints a single JSON line
+CHILD = """
+import json, resource, sys, time
+import data_export
+command, db_path, out_path, chunk_rows = sys.argv[1], sys.argv[2], sys.argv[3], int(sys.argv[4])
+start = time.perf_counter()
+if command == "backup":
+    data_export.backup(out_path, db_path)
+    rows = None
+else:
+    rows = data_export.export(out_path, command, db_path=db_path, chunk_rows=chunk_rows)
+print(json.dumps({"seconds": time.perf_counter() - start, "rows": rows,
+                  "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--chunk-rows", type=int, default=50000)
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "exercise.db")
+        start = time.perf_counter()
+        seed_db(db_path, args.rows)
+        print(f"seeded {args.rows:,} rows in {time.perf_counter() - start:.1f} s ({os.path.getsize(db_path) / 2**20:.0f} MiB)")
+
+        for command in ["csv", "parquet", "arrow", "backup"]:
+            out_path = os.path.join(tmp, f"out.{command}")
+            result = subprocess.run([sys.executable, "-c", CHILD, command, db_path, out_path, str(args.chunk_rows)],
+                                    env=env, capture_output=True, text=True)
+            if result.returncode != 0:
+                print(f"{command:<8} failed: {result.stderr.strip().splitlines()[-1]}")
+                continue
+            report = json.loads(result.stdout.strip().splitlines()[-1])
+            print(f"{command:<8} {report['seconds']:7.1f} s | {args.rows / report['seconds']:12,.0f} rows/s | "
+                  f"peak RSS {report['peak_rss_kb'] / 1024:7.1f} MiB | output {os.path.getsize(out_path) / 2**20:7.1f} MiB")
+            os.remove(out_path)
+
+if __name__ == "__main__":
+    main()
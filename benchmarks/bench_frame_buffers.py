@@ -0,0 +1,72 @@
+"""Per-frame allocations, RSS growth and snapshot save latency of the tracker frame loop.
+
+Uses a synthetic capture that fills frames like cv2.VideoCapture does: it allocates a new
+frame when none is passed in and writes in place otherwise. No camera or model is needed.
+
+Run from the repository root: python -m benchmarks.bench_frame_buffers
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import cv2
+import numpy as np
+import psutil
+from frame_buffers import FrameRing, SnapshotWriter
+
+class SyntheticCapture:
+    def __init__(self, width, height):
+        rng = np.random.default_rng(0)
+        self._source = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+
+    def read(self, image=None):
+        if image is None:
+            image = np.empty_like(self._source)
+        np.copyto(image, self._source)
+        return True, image
+
+def run_loop(label, read, frames):
+    process = psutil.Process()
+    for _ in range(50):  # Warm up so one-off allocations are not counted
+        read()
+    rss_before = process.memory_info().rss
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(frames):
+        read()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    allocated = sum(stat.size for stat in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+    rss_growth = process.memory_info().rss - rss_before
+    print(f"{label:<12} {elapsed / frames * 1e6:8.1f} us/frame | traced peak {peak / 1024:8.1f} KiB | "
+          f"still allocated {allocated / 1024:8.1f} KiB | RSS growth {rss_growth / 1024:8.1f} KiB")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    args = parser.parse_args()
+
+    cap = SyntheticCapture(args.width, args.height)
+    run_loop("allocating", lambda: cap.read(), args.frames)
+    ring = FrameRing()
+    run_loop("ring", lambda: ring.read(cap), args.frames)
+
+    frame = cap.read()[1]
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        cv2.imwrite(os.path.join(tmp, "sync.jpg"), frame)
+        sync = time.perf_counter() - start
+
+        writer = SnapshotWriter()
+        start = time.perf_counter()
+        future = writer.submit(frame, os.path.join(tmp, "async.jpg"))
+        queued = time.perf_counter() - start
+        future.result()
+    print(f"snapshot save blocks the page for {sync * 1000:.2f} ms synchronously, {queued * 1000:.3f} ms in the background writer")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Loopback test and benchmark of capture stations streaming keypoints to the ingest server.
+
+Starts the ingest server on a temporary database and runs several stations that stream
+synthetic squat keypoints (benchmarks/pose_synth.py) through a proxy. The proxy drops each station's first
+connection part-way through, so every station has to reconnect and resume. Reports
+ingest throughput, bandwidth per station compared with streaming JPEG video, and
+whether the server's rep counts match counting the same keypoints locally.
+
+Run from the repository root: python -m benchmarks.bench_keypoint_ingest
+"""
+import argparse
+import asyncio
+import math
+import os
+import tempfile
+import time
+import cv2
+import numpy as np
+from ingest_server import IngestServer
+from rep_counter import RepCounter
+from station_client import StationClient
+from benchmarks.pose_synth import FPS, generate
+
+class DropProxy:
+    """Forwards station connections to the server, cutting each station's first connection after `drop_after` bytes."""
+
+    def __init__(self, target_port, stations, drop_after):
+        self.target_port = target_port
+        self.stations = stations
+        self.drop_after = drop_after
+        self.connections = 0
+        self.port = None
+
+    async def start(self):
+        server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = server.sockets[0].getsockname()[1]
+
+    async def _handle(self, client_reader, client_writer):
+        self.connections += 1
+        upstream_reader, upstream_writer = await asyncio.open_connection("127.0.0.1", self.target_port)
+        # Stations open one connection each at start, so the first N connections are the ones to cut
+        limit = self.drop_after if self.connections <= self.stations else math.inf
+
+        async def pipe(reader, writer, limit):
+            sent = 0
+            try:
+                while data := await reader.read(4096):
+                    if sent + len(data) > limit:
+                        break
+                    writer.write(data)
+                    sent += len(data)
+                    await writer.drain()
+            except ConnectionError:
+                pass
+            finally:
+                client_writer.close()
+                upstream_writer.close()
+
+        await asyncio.gather(pipe(client_reader, upstream_writer, limit), pipe(upstream_reader, client_writer, math.inf))
+
+async def run_station(proxy_port, people):
+    client = StationClient("127.0.0.1", proxy_port, "Squat")
+    await client.start()
+    for i, frame in enumerate(people):
+        await client.send_frame(i * 1000 // FPS, frame)
+    session_id, count = await client.finish(timeout=30)
+    return client, count
+
+async def run(args):
+    rng = np.random.default_rng(0)
+    frames = int(args.seconds * FPS)
+    workouts = [generate("Squat", args.seconds, seed=seed).frames for seed in range(args.stations)]
+
+    expected = []
+    for people in workouts:
+        counter = RepCounter()
+        for frame in people:
+            counter.update(frame[..., :2])
+        expected.append(counter.count[0])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = IngestServer(os.path.join(tmp, "exercise.db"), port=0)
+        await server.start()
+        proxy = DropProxy(server.port, args.stations, args.drop_after)
+        await proxy.start()
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(run_station(proxy.port, people) for people in workouts))
+        elapsed = time.perf_counter() - start
+        await server.close()
+
+    counts = [count for _, count in results]
+    station_bytes = sum(client.bytes_sent for client, _ in results) / args.stations
+    keypoint_rate = station_bytes / args.seconds
+
+    # One 640x480 webcam frame with some texture, as MJPEG streaming would send it
+    frame = (np.add.outer(np.arange(480), np.arange(640)) % 256).astype(np.uint8)
+    frame = np.dstack([frame] * 3) + rng.integers(0, 16, (480, 640, 3), dtype=np.uint8)
+    video_rate = len(cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 80])[1]) * FPS
+
+    print(f"stations {args.stations} x {args.seconds:.0f} s at {FPS} fps: {args.stations * frames / elapsed:,.0f} frames/s ingested, "
+          f"{server.batches_written} write transactions")
+    print(f"bandwidth per station: keypoints {keypoint_rate / 1024:.2f} KiB/s vs JPEG video {video_rate / 1024:.0f} KiB/s "
+          f"({video_rate / keypoint_rate:,.0f}x less)")
+    print(f"reconnects: {sum(client.reconnects for client, _ in results)}, "
+          f"counts match local counting: {counts == expected} ({sum(counts)} reps)")
+    return counts == expected
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stations", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=120)
+    parser.add_argument("--drop-after", type=int, default=20000, help="bytes before each station's first connection is cut")
+    args = parser.parse_args()
+    if not asyncio.run(run(args)):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
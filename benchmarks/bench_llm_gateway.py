@@ -0,0 +1,64 @@
+"""Throughput of concurrent chat sessions with and without the shared LLM gateway.
+
+Each session is a thread, as in Streamlit, and asks one question against a local mock
+OpenAI-compatible server. "per-session" builds a ChatOpenAI per session and calls it
+synchronously, like the page used to. "gateway" sends every call through LLMGateway.
+A share of the sessions repeat the same question to show request coalescing.
+
+Run from the repository root: python -m benchmarks.bench_llm_gateway
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from langchain_openai import ChatOpenAI
+from llm_gateway import LLMGateway
+from benchmarks.common import percentile
+from benchmarks.mock_openai_server import MockOpenAIServer
+
+def run(label, server, sessions, ask):
+    requests_before, connections_before = server.requests, server.connections
+    latencies = []
+
+    def session(i):
+        start = time.perf_counter()
+        ask(i)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        list(pool.map(session, range(sessions)))
+    elapsed = time.perf_counter() - start
+
+    print(f"{label:<12} {sessions / elapsed:7.1f} sessions/s | p95 {percentile(latencies, 0.95) * 1000:7.1f} ms | "
+          f"upstream requests {server.requests - requests_before:4d} | new connections {server.connections - connections_before:4d}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2, help="mock server response time in seconds")
+    parser.add_argument("--duplicate-share", type=float, default=0.3, help="share of sessions asking the same question")
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(latency=args.latency).start_in_thread()
+    duplicates = int(args.sessions * args.duplicate_share)
+
+    def question(i):
+        return "How many squats did I do in 2024?" if i < duplicates else f"How many push ups did I do on day {i}?"
+
+    def per_session(i):
+        llm = ChatOpenAI(model="gpt-4o", temperature=0, base_url=server.base_url, api_key="local", max_retries=0)
+        llm.invoke(question(i))
+
+    gateway = LLMGateway(max_concurrency=args.max_concurrency)
+    llm = gateway.wrap(gateway.chat_model(model="gpt-4o", temperature=0, base_url=server.base_url,
+                                          api_key="local", max_retries=0))
+
+    def through_gateway(i):
+        gateway.run(llm.ainvoke(question(i)))
+
+    run("per-session", server, args.sessions, per_session)
+    run("gateway", server, args.sessions, through_gateway)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""Counting accuracy, throughput and per-frame latency of every rep counting path, on CPU.
+
+Runs the synthetic scenarios from benchmarks/pose_synth.py through each counting
+configuration, with no camera or model needed:
+
+- rep_counter: RepCounter on the raw keypoints.
+- ingest: keypoints encoded and decoded with the station protocol, then counted and
+  recorded by the ingest server's session.
+- tracker_loop: the tracker page's per-frame work apart from the model and window:
+  reading into the frame ring, counting, then the page's own WorkoutLoop step.
+
+--db adds recorded sessions from a workout database's rep event log. --video adds
+recorded video clips. Those are also run through the inference configurations: the
+tracker's AIGym, and the station path (YOLO pose tracking plus RepCounter) at two input
+sizes. Video runs need ultralytics and are skipped without it.
+
+Exits non-zero when the synthetic accuracy or median frame latency of a configuration
+regresses against the stored baseline.
+
+Run from the repository root: python -m benchmarks.bench_rep_counting
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+from ingest_server import IngestSession
+from keypoint_protocol import decode, encode_frame
+from rep_counter import RepCounter, keypoints_dict, DOWN_ANGLE
+from workout_loop import WorkoutLoop
+from benchmarks.bench_frame_buffers import SyntheticCapture
+from benchmarks.common import percentile
+from benchmarks.pose_synth import WIDTH, HEIGHT, load_recorded, scenarios
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rep_counting_baseline.json")
+INFERENCE_SIZES = [640, 320]
+
+def rep_counter(clip):
+    counter = RepCounter()
+
+    def step(people, time_ms):
+        return counter.update(people[..., :2])
+    return step
+
+def ingest(clip):
+    session = IngestSession(clip.exercise_type, len(keypoints_dict[clip.exercise_type]))
+    seq = 0
+
+    def step(people, time_ms):
+        nonlocal seq
+        seq += 1
+        _, message = decode(encode_frame(seq, int(time_ms), people)[2:], session.num_joints)
+        session.add_frame(message["time_ms"], message["people"])
+        return session.counter.count
+    return step
+
+def tracker_loop(clip):
+    cap = SyntheticCapture(WIDTH, HEIGHT)
+    counter = RepCounter()
+    loop = WorkoutLoop(clip.exercise_type, len(keypoints_dict[clip.exercise_type]))
+
+    def step(people, time_ms):
+        loop.ring.read(cap)
+        counter.update(people[..., :2])
+        keypoints = (people[0, :, :2], people[0, :, 2]) if len(people) else None
+        loop.step(counter, keypoints, time_ms / 1000)
+        return counter.count
+    return step
+
+COUNTING_CONFIGS = {"rep_counter": rep_counter, "ingest": ingest, "tracker_loop": tracker_loop}
+
+def run_clip(make_step, clip):
+    """Counts one clip. Returns the final counts and per-frame latencies in seconds."""
+    step = make_step(clip)
+    latencies = np.empty(len(clip))
+    counts = []
+    for i, (people, time_ms) in enumerate(zip(clip.frames, clip.times_ms)):
+        start = time.perf_counter()
+        counts = step(people, time_ms)
+        latencies[i] = time.perf_counter() - start
+    return list(counts), latencies
+
+def summarise(results):
+    """Accuracy and latency figures for one configuration over (clip, counts, latencies) results."""
+    expected = sum(sum(clip.expected) for clip, _, _ in results)
+    error = 0
+    for clip, counts, _ in results:
+        counts = counts + [0] * (len(clip.expected) - len(counts))
+        error += sum(abs(c - e) for c, e in zip(counts, clip.expected)) + sum(counts[len(clip.expected):])
+    latencies = np.concatenate([latencies for _, _, latencies in results]) if results else np.zeros(0)
+    return {
+        "clips": len(results),
+        "accuracy": round(sum(counts == clip.expected for clip, counts, _ in results) / max(len(results), 1), 4),
+        "rep_error": round(error / max(expected, 1), 4),
+        "fps": round(len(latencies) / latencies.sum()) if latencies.sum() else 0,
+        "p50_us": round(percentile(latencies, 0.5) * 1e6, 2),
+        "p95_us": round(percentile(latencies, 0.95) * 1e6, 2),
+        "p99_us": round(percentile(latencies, 0.99) * 1e6, 2),
+    }
+
+def print_table(title, clips, columns):
+    """One row per clip: what each configuration counted against what was expected."""
+    print(f"\n{title}")
+    print(f"{'clip':<30}{'expected':>14}" + "".join(f"{name:>20}" for name in columns))
+    for i, clip in enumerate(clips):
+        cells = []
+        for counts in columns.values():
+            mark = "" if counts[i] == clip.expected else " *"
+            cells.append(f"{','.join(map(str, counts[i])) + mark:>20}")
+        print(f"{clip.name[:29]:<30}{','.join(map(str, clip.expected)):>14}" + "".join(cells))
+
+def print_summary(report):
+    print(f"\n{'configuration':<24}{'clips':>6}{'exact':>8}{'rep err':>9}{'fps':>11}{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}")
+    for name, r in report.items():
+        print(f"{name:<24}{r['clips']:>6}{r['accuracy']:>8.0%}{r['rep_error']:>9.1%}{r['fps']:>11,}"
+              f"{r['p50_us']:>10.1f}{r['p95_us']:>10.1f}{r['p99_us']:>10.1f}")
+
+def run_counting(clips):
+    report, columns = {}, {}
+    for name, make_step in COUNTING_CONFIGS.items():
+        results = [(clip, *run_clip(make_step, clip)) for clip in clips]
+        report[name] = summarise(results)
+        columns[name] = [counts for _, counts, _ in results]
+    return report, columns
+
+def video_frames(path):
+    import cv2
+    cap = cv2.VideoCapture(path)
+    try:
+        while True:
+            success, frame = cap.read()
+            if not success:
+                return
+            yield frame
+    finally:
+        cap.release()
+
+def run_inference(videos):
+    """Runs each recorded video through the tracker's AIGym and the station path. Returns report and table columns."""
+    try:
+        from ultralytics import solutions, YOLO
+    except ImportError:
+        print("\nVideo clips skipped: ultralytics is not installed")
+        return {}, {}, []
+    from resources import POSE_MODEL
+
+    class VideoClip:
+        def __init__(self, path, exercise_type, reps):
+            self.name = os.path.basename(path)
+            self.path = path
+            self.exercise_type = exercise_type
+            self.expected = [reps]
+
+    clips = [VideoClip(path, exercise_type, int(reps)) for path, exercise_type, reps in videos]
+
+    def aigym(clip):
+        gym = solutions.AIGym(show=False, kpts=keypoints_dict[clip.exercise_type], model=POSE_MODEL,
+                              line_width=2, verbose=False, down_angle=DOWN_ANGLE)
+
+        def step(frame):
+            gym.monitor(frame)
+            return gym.count
+        return step
+
+    def station(imgsz):
+        def make(clip):
+            model = YOLO(POSE_MODEL)
+            joints = keypoints_dict[clip.exercise_type]
+            counter = RepCounter()
+
+            def step(frame):
+                result = model.track(frame, persist=True, verbose=False, imgsz=imgsz, device="cpu")[0]
+                if result.keypoints is not None and result.boxes.id is not None:
+                    counter.update(result.keypoints.data[:, joints].cpu().numpy()[::-1][..., :2])
+                return counter.count
+            return make
+        return make
+
+    configs = {"aigym": aigym, **{f"station_{size}": station(size) for size in INFERENCE_SIZES}}
+    report, columns = {}, {}
+    for name, make_step in configs.items():
+        results = []
+        for clip in clips:
+            step = make_step(clip)
+            latencies, counts = [], []
+            for frame in video_frames(clip.path):
+                start = time.perf_counter()
+                counts = step(frame)
+                latencies.append(time.perf_counter() - start)
+            results.append((clip, list(counts), np.array(latencies)))
+        report[name] = summarise(results)
+        columns[name] = [counts for _, counts, _ in results]
+    return report, columns, clips
+
+def regressions(report, baseline, tolerance):
+    """Lists every synthetic-clip metric that is worse than the baseline beyond the allowed tolerance."""
+    problems = []
+    for name, limits in baseline.items():
+        if name not in report:
+            problems.append(f"{name} missing from the report")
+            continue
+        if report[name]["accuracy"] < limits["accuracy"]:
+            problems.append(f"{name} accuracy {report[name]['accuracy']} < baseline {limits['accuracy']}")
+        # A small absolute allowance keeps microsecond-scale paths from flapping on noisy machines
+        allowed = max(limits["p50_us"] * (1 + tolerance), limits["p50_us"] + 5)
+        if report[name]["p50_us"] > allowed:
+            problems.append(f"{name} p50 {report[name]['p50_us']} us > allowed {allowed:.2f} us")
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=60, help="length of each synthetic clip")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db", help="workout database whose recorded sessions are added")
+    parser.add_argument("--video", nargs=3, action="append", default=[], metavar=("PATH", "EXERCISE", "REPS"),
+                        help="recorded video clip, its exercise and its true rep count; repeatable")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative median latency increase")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+    os.environ.setdefault("CUDA_VISIBLE_DEVICES", "")  # Inference runs on CPU, like a capture station
+
+    clips = scenarios(args.seconds, args.seed)
+    report, columns = run_counting(clips)
+    print_table("Synthetic clips (* = miscounted)", clips, columns)
+    print_summary(report)
+
+    if args.db:
+        recorded = load_recorded(args.db)
+        recorded_report, recorded_columns = run_counting(recorded)
+        print_table("Recorded sessions, expected = count saved by the tracker", recorded, recorded_columns)
+        print_summary(recorded_report)
+
+    if args.video:
+        video_report, video_columns, videos = run_inference(args.video)
+        if video_report:
+            print_table("Recorded videos", videos, video_columns)
+            print_summary(video_report)
+
+    if args.update_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump({name: {"accuracy": r["accuracy"], "p50_us": r["p50_us"]} for name, r in report.items()}, f, indent=4)
+        return
+
+    with open(BASELINE_PATH) as f:
+        problems = regressions(report, json.load(f), args.tolerance)
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    if problems:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
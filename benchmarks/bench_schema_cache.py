@@ -0,0 +1,66 @@
+"""Compares prompt size and per-question latency of the SQL chain with and without the schema cache.
+
+Run from the repository root: python -m benchmarks.bench_schema_cache
+"""
+import argparse
+import os
+import tempfile
+import time
+from langchain.chains import create_sql_query_chain
+from langchain_community.utilities import SQLDatabase
+from langchain_core.language_models.llms import LLM
+from schema_cache import open_sql_db
+from benchmarks.common import count_tokens, percentile, seed_db
+
+QUESTIONS = [
+    "How many exercise entries are there in total?",
+    "List all exercise entries where the type is 'Squat'.",
+    "Find the average number of exercises performed across all entries.",
+    "How many times did I do push-ups in 2024?",
+]
+
+class StubLLM(LLM):
+    """Returns a fixed query and records the size of every prompt it receives."""
+    prompts: list = []
+
+    @property
+    def _llm_type(self):
+        return "stub"
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        self.prompts.append(prompt)
+        return "SELECT COUNT(*) FROM exercise_table;"
+
+def run(label, make_db, rounds):
+    llm = StubLLM(prompts=[])
+    start = time.perf_counter()
+    db = make_db()
+    setup = time.perf_counter() - start
+
+    chain = create_sql_query_chain(llm, db)
+    latencies = []
+    for _ in range(rounds):
+        for question in QUESTIONS:
+            start = time.perf_counter()
+            chain.invoke({"question": question})
+            latencies.append(time.perf_counter() - start)
+
+    tokens = sum(count_tokens(p) for p in llm.prompts) / len(llm.prompts)
+    print(f"{label:<10} setup {setup * 1000:7.1f} ms | prompt {tokens:6.0f} tokens | "
+          f"p50 {percentile(latencies, 0.5) * 1000:6.2f} ms | p95 {percentile(latencies, 0.95) * 1000:6.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=25)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "exercise.db")
+        seed_db(path, args.rows)
+        uri = f"sqlite:///{path}"
+        run("default", lambda: SQLDatabase.from_uri(uri), args.rounds)
+        run("cached", lambda: open_sql_db(uri), args.rounds)
+
+if __name__ == "__main__":
+    main()
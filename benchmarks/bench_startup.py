@@ -0,0 +1,76 @@
+"""Import time and first-paint time of every Streamlit page.
+
+Each page runs in a fresh Python process with streamlit's AppTest against a seeded
+exercise.db. For each page it reports the cold first run (imports and resource setup
+included), a warm rerun in the same process, and which heavy libraries were imported.
+
+Run from the repository root: python -m benchmarks.bench_startup
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ["main.py", "pages/1History.py", "pages/2Tracker.py", "pages/3Chatbot.py", "pages/4Database.py"]
+HEAVY_MODULES = ["torch", "ultralytics", "langchain", "langchain_openai", "faiss"]
+
+# Runs inside the child process; prints a single JSON line
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+streamlit_import = time.perf_counter() - start
+app = AppTest.from_file(sys.argv[1], default_timeout=300)
+start = time.perf_counter()
+app.run()
+first_paint = time.perf_counter() - start
+start = time.perf_counter()
+app.run()
+rerun = time.perf_counter() - start
+print(json.dumps({
+    "streamlit_import_ms": streamlit_import * 1000,
+    "first_paint_ms": first_paint * 1000,
+    "rerun_ms": rerun * 1000,
+    "heavy_modules": [m for m in sys.argv[2:] if m in sys.modules],
+    "exceptions": [str(e.message) for e in app.exception],
+}))
+"""
+
+def measure(page, cwd, env):
+    result = subprocess.run([sys.executable, "-c", CHILD, os.path.join(ROOT, page), *HEAVY_MODULES],
+                            cwd=cwd, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{page} failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--with-llm", action="store_true",
+                        help="serve the LLM pages from the local mock OpenAI server instead of running them without a key "
+                             "(the embeddings client still needs tiktoken's encodings in its local cache)")
+    args = parser.parse_args()
+
+    from benchmarks.common import seed_db
+
+    env = {k: v for k, v in os.environ.items() if k not in ("OPENAI_KEY", "OPENAI_API_KEY")}
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")]))
+    if args.with_llm:
+        from benchmarks.mock_openai_server import MockOpenAIServer
+        server = MockOpenAIServer(latency=0.0).start_in_thread()
+        env.update(OPENAI_KEY="local", OPENAI_BASE_URL=server.base_url, OPENAI_API_BASE=server.base_url)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        seed_db(os.path.join(tmp, "exercise.db"), args.rows)
+        for page in PAGES:
+            report = measure(page, tmp, env)
+            print(f"{page:<20} first paint {report['first_paint_ms']:8.1f} ms | rerun {report['rerun_ms']:7.1f} ms | "
+                  f"heavy imports: {', '.join(report['heavy_modules']) or '-'}")
+            for message in report["exceptions"]:
+                print(f"    exception: {message}")
+
+if __name__ == "__main__":
+    main()
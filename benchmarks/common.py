@@ -0,0 +1,29 @@
+"""Helpers shared by the benchmark scripts."""
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+def count_tokens(text):
+    """Approximate token count (~4 characters per token), so the benchmarks need no tokenizer download."""
+    return len(text) // 4
+
+def seed_db(path, rows, seed=0):
+    """Creates exercise_table in a fresh database and fills it with reproducible entries from 2024."""
+    conn = sqlite3.connect(path)
+    conn.execute('''CREATE TABLE exercise_table (
+                        ID INTEGER PRIMARY KEY AUTOINCREMENT,
+                        Datetime DATETIME,
+                        Count INTEGER,
+                        Exercise_Type TEXT)''')
+    rng = random.Random(seed)
+    conn.executemany(
+        "INSERT INTO exercise_table (Datetime, Count, Exercise_Type) VALUES (?, ?, ?)",
+        (((datetime(2024, 1, 1) + timedelta(minutes=rng.randint(0, 525600))).strftime("%Y-%m-%d %H:%M:%S.%f"),
+          rng.randint(1, 60), rng.choice(["Squat", "Push Up"])) for _ in range(rows))
+    )
+    conn.commit()
+    conn.close()
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else 0.0
@@ -0,0 +1,198 @@
+"""Offline accuracy and latency evaluation of the chatbot SQL pipeline.
+
+Replays a corpus of questions (the few-shot examples plus benchmarks/chatbot_corpus.json)
+against a seeded exercise.db. SQL generation uses recorded LLM responses by default, or a
+local OpenAI-compatible server with --base-url. Reports per-stage latency, token counts and
+result accuracy against the expected SQL, and exits non-zero on a regression against the
+stored baseline.
+
+Run from the repository root: python -m benchmarks.eval_chatbot
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.example_selectors import BaseExampleSelector
+from langchain_core.language_models.llms import LLM
+import sql_results
+from chatbot_chain import examples, build_example_selector, build_write_query
+from schema_cache import open_sql_db
+from benchmarks.common import count_tokens, percentile, seed_db
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CORPUS_PATH = os.path.join(HERE, "chatbot_corpus.json")
+RECORDED_PATH = os.path.join(HERE, "recorded_responses.json")
+BASELINE_PATH = os.path.join(HERE, "chatbot_eval_baseline.json")
+STAGES = ["example_selection", "sql_generation", "execution", "visualisation"]
+
+class RecordedLLM(LLM):
+    """Answers each prompt with the recorded response for the question it contains."""
+    responses: dict
+    prompts: list = []
+
+    @property
+    def _llm_type(self):
+        return "recorded"
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        self.prompts.append(prompt)
+        # create_sql_query_chain appends "\nSQLQuery: " to the question inside the prompt suffix
+        question = prompt.rsplit("User input: ", 1)[1].split("\nSQLQuery:", 1)[0].strip()
+        if question not in self.responses:
+            raise KeyError(f"No recorded response for: {question}")
+        return self.responses[question]
+
+class TimedExampleSelector(BaseExampleSelector):
+    """Wraps the chain's example selector and adds up the time spent selecting examples."""
+
+    def __init__(self, selector):
+        self.selector = selector
+        self.seconds = 0.0
+
+    def add_example(self, example):
+        return self.selector.add_example(example)
+
+    def select_examples(self, input_variables):
+        start = time.perf_counter()
+        try:
+            return self.selector.select_examples(input_variables)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+def load_corpus():
+    with open(CORPUS_PATH) as f:
+        return list(examples) + json.load(f)
+
+def normalise(df):
+    """Order-insensitive, column-name-insensitive view of a result for comparison."""
+    rows = []
+    for row in df.itertuples(index=False):
+        values = []
+        for value in row:
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                value = None if math.isnan(value) else round(float(value), 6)
+            values.append(value)
+        rows.append(tuple(values))
+    return sorted(rows, key=repr)
+
+def build_models(args):
+    if args.base_url:
+        from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+        llm = ChatOpenAI(model=args.model, temperature=0, base_url=args.base_url, api_key="local")
+        embedding_model = OpenAIEmbeddings(model=args.embedding_model, base_url=args.base_url, api_key="local",
+                                           check_embedding_ctx_length=False)
+        return llm, embedding_model, []
+
+    with open(RECORDED_PATH) as f:
+        llm = RecordedLLM(responses=json.load(f), prompts=[])
+    return llm, DeterministicFakeEmbedding(size=256), llm.prompts
+
+def evaluate(args):
+    corpus = load_corpus()
+    timings = {stage: [] for stage in STAGES}
+    failures = []
+    completion_tokens = 0
+    recorded = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "exercise.db")
+        seed_db(path, args.rows)
+        sql_results.DB_PATH = path
+
+        llm, embedding_model, prompts = build_models(args)
+        db = open_sql_db(f"sqlite:///{path}")
+        example_selector = TimedExampleSelector(build_example_selector(embedding_model))
+        write_query = build_write_query(llm, db, example_selector)
+
+        for item in corpus:
+            question = item["input"]
+
+            # Examples are selected inside the chain, so that time is split out of SQL generation
+            example_selector.seconds = 0.0
+            start = time.perf_counter()
+            sql = write_query.invoke({"question": question})
+            timings["example_selection"].append(example_selector.seconds)
+            timings["sql_generation"].append(time.perf_counter() - start - example_selector.seconds)
+            completion_tokens += count_tokens(sql)
+            recorded[question] = sql
+
+            try:
+                start = time.perf_counter()
+                _, df = sql_results.run_query(sql)
+                timings["execution"].append(time.perf_counter() - start)
+            except Exception as e:
+                failures.append((question, f"execution failed: {e}"))
+                continue
+
+            kind = sql_results.chart_type(question)
+            if kind in ("bar", "line") and len(df.columns) >= 2:
+                start = time.perf_counter()
+                sql_results.chart_frame(df)
+                timings["visualisation"].append(time.perf_counter() - start)
+
+            _, expected = sql_results.run_query(item["query"])
+            if normalise(df) != normalise(expected):
+                failures.append((question, f"result differs from expected query: {sql}"))
+
+    if args.record:
+        with open(RECORDED_PATH, "w") as f:
+            json.dump(recorded, f, indent=4)
+
+    return {
+        "questions": len(corpus),
+        "accuracy": round(1 - len(failures) / len(corpus), 4),
+        "prompt_tokens": sum(count_tokens(p) for p in prompts) // max(len(prompts), 1),
+        "completion_tokens": completion_tokens // len(corpus),
+        "p50_ms": {stage: round(percentile(v, 0.5) * 1000, 3) for stage, v in timings.items()},
+        "p95_ms": {stage: round(percentile(v, 0.95) * 1000, 3) for stage, v in timings.items()},
+    }, failures
+
+def regressions(report, baseline, tolerance):
+    """Lists every metric that is worse than the baseline beyond the allowed tolerance."""
+    problems = []
+    if report["accuracy"] < baseline["accuracy"]:
+        problems.append(f"accuracy {report['accuracy']} < baseline {baseline['accuracy']}")
+    if baseline.get("prompt_tokens") and report["prompt_tokens"] > baseline["prompt_tokens"] * 1.1:
+        problems.append(f"prompt tokens {report['prompt_tokens']} > baseline {baseline['prompt_tokens']} + 10%")
+    # Gate on the median: with a corpus this small the p95 is a single sample and too noisy to fail on
+    for stage, limit in baseline["p50_ms"].items():
+        # A small absolute allowance keeps millisecond-scale stages from flapping on noisy machines
+        allowed = max(limit * (1 + tolerance), limit + 5)
+        if report["p50_ms"].get(stage, 0) > allowed:
+            problems.append(f"{stage} p50 {report['p50_ms'][stage]} ms > allowed {allowed:.3f} ms")
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000, help="rows seeded into exercise_table")
+    parser.add_argument("--base-url", help="local OpenAI-compatible server to use instead of recorded responses")
+    parser.add_argument("--model", default="gpt-4o")
+    parser.add_argument("--embedding-model", default="text-embedding-3-large")
+    parser.add_argument("--record", action="store_true", help="save the generated SQL as the new recorded responses")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative median latency increase")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    report, failures = evaluate(args)
+    print(json.dumps(report, indent=4))
+    for question, reason in failures:
+        print(f"FAIL {question}: {reason}")
+
+    if args.update_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(report, f, indent=4)
+        return
+
+    with open(BASELINE_PATH) as f:
+        problems = regressions(report, json.load(f), args.tolerance)
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    if problems:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Minimal OpenAI-compatible HTTP server for offline benchmarks.
+
+Serves /v1/chat/completions and /v1/embeddings on loopback with a fixed artificial
+latency, keeps connections alive and counts connections and requests.
+
+Run standalone from the repository root: python -m benchmarks.mock_openai_server --port 8765
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import threading
+
+class MockOpenAIServer:
+    def __init__(self, host="127.0.0.1", port=0, latency=0.05, reply="SELECT COUNT(*) FROM exercise_table;"):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.reply = reply
+        self.connections = 0
+        self.requests = 0
+        self._server = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}/v1"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    def start_in_thread(self):
+        """Starts the server on its own event loop thread and returns once it is listening."""
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run():
+            loop.run_until_complete(self.start())
+            ready.set()
+            loop.run_forever()
+
+        threading.Thread(target=run, name="mock-openai", daemon=True).start()
+        ready.wait()
+        return self
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                _, path, _ = request_line.decode().split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b""):
+                    name, value = line.decode().split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+                body = json.loads(await reader.readexactly(int(headers.get("content-length", 0))) or b"{}")
+
+                self.requests += 1
+                await asyncio.sleep(self.latency)
+                payload = json.dumps(self._respond(path, body)).encode()
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                             + f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _respond(self, path, body):
+        if path.endswith("/embeddings"):
+            inputs = body.get("input", [])
+            inputs = inputs if isinstance(inputs, list) else [inputs]
+            return {"object": "list", "model": body.get("model"), "usage": {"prompt_tokens": 0, "total_tokens": 0},
+                    "data": [{"object": "embedding", "index": i, "embedding": _embed(str(text))} for i, text in enumerate(inputs)]}
+
+        prompt_tokens = len(json.dumps(body.get("messages", []))) // 4
+        return {
+            "id": "chatcmpl-mock", "object": "chat.completion", "created": 0, "model": body.get("model"),
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": self.reply}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(self.reply) // 4,
+                      "total_tokens": prompt_tokens + len(self.reply) // 4},
+        }
+
+def _embed(text, size=64):
+    digest = hashlib.sha256(text.encode()).digest()
+    return [(digest[i % len(digest)] - 128) / 128 for i in range(size)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds to wait before each response")
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(port=args.port, latency=args.latency)
+
+    async def serve():
+        await server.start()
+        print(f"Mock OpenAI server listening on {server.base_url}")
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+if __name__ == "__main__":
+    main()
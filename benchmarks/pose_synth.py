@@ -0,0 +1,174 @@
+"""Synthetic and recorded pose sequences for testing and benchmarking rep counting.
+
+A clip is what the counters see: per frame, the keypoints_dict joints of every detected
+person as an array (people, joints, 3) of pixel x, y and confidence, in the order AIGym
+counts them. Synthetic clips know how many reps each person really did, so counting
+accuracy can be measured. They can vary tempo, keypoint noise, joint occlusions, lost
+detections, partial reps and the number of people.
+
+Recorded clips are read back from the rep event log (rep_event_table) of a real
+database. Their expected counts are the counts saved with the workout.
+"""
+import sqlite3
+import numpy as np
+from rep_events import TABLE as REP_EVENT_TABLE, load_session
+
+FPS = 30
+WIDTH, HEIGHT = 640, 480
+NUM_JOINTS = 3
+
+# Angle range of a full rep at the tracked joint, and how the bend is split between the
+# segment towards the first joint (torso / upper arm) and the one towards the third
+EXERCISES = {
+    "Squat": {"top": (165, 178), "bottom": (55, 85), "partial": (110, 135), "lean": 0.4,
+              "segments": (110, 95), "sink": 0.5, "y": 0.45},
+    "Push Up": {"top": (160, 175), "bottom": (65, 90), "partial": (110, 135), "lean": 0.7,
+                "segments": (70, 65), "sink": 0.3, "y": 0.6},
+}
+
+class PoseClip:
+    """Keypoint frames of one clip plus the rep count each person should end with."""
+
+    def __init__(self, name, exercise_type, frames, times_ms, expected):
+        self.name = name
+        self.exercise_type = exercise_type
+        self.frames = frames  # One array (people, joints, 3) per frame
+        self.times_ms = times_ms
+        self.expected = expected
+
+    def __len__(self):
+        return len(self.frames)
+
+    @property
+    def seconds(self):
+        return self.times_ms[-1] / 1000 if len(self.times_ms) else 0.0
+
+def _angle_track(frames, fps, spec, tempo, partial_reps, rng):
+    """Per-frame joint angle for one person, and the number of full reps in it."""
+    angle = np.empty(frames, np.float32)
+    top = rng.uniform(*spec["top"])
+    i = int(rng.uniform(0.5, 1.5) * fps)  # Starts standing still
+    angle[:i] = top
+    reps = 0
+    while True:
+        duration = rng.uniform(*tempo)
+        down, hold, up, pause = (np.array([0.4, 0.1, 0.4, 0.1]) * duration * fps).astype(int) + 1
+        if i + down + hold + up + pause > frames:
+            break
+        partial = rng.random() < partial_reps
+        bottom = rng.uniform(*spec["partial" if partial else "bottom"])
+        next_top = rng.uniform(*spec["top"])
+        # Cosine easing in and out of each movement, as a body decelerates at the ends
+        ease = lambda n: (1 - np.cos(np.linspace(0, np.pi, n))) / 2
+        angle[i:i + down] = top + (bottom - top) * ease(down)
+        angle[i + down:i + down + hold] = bottom
+        angle[i + down + hold:i + down + hold + up] = bottom + (next_top - bottom) * ease(up)
+        angle[i + down + hold + up:i + down + hold + up + pause] = next_top
+        i += down + hold + up + pause
+        top = next_top
+        reps += not partial
+    angle[i:] = top
+    return angle, reps
+
+def _joints(angle, spec, centre, scale, facing):
+    """Pixel positions (frames, 3, 2) of the three joints for a joint angle track, side view."""
+    bend = np.radians(180 - angle)
+    first = bend * spec["lean"]  # Rotation of the first segment away from vertical
+    third = bend - first
+    upper, lower = (length * scale for length in spec["segments"])
+    middle = np.zeros((len(angle), 2), np.float32)
+    middle[:, 0] = centre[0]
+    middle[:, 1] = centre[1] + spec["sink"] * upper * (bend / np.pi)  # The body lowers as it bends
+    joints = np.empty((len(angle), NUM_JOINTS, 2), np.float32)
+    joints[:, 0, 0] = middle[:, 0] + facing * upper * np.sin(first)
+    joints[:, 0, 1] = middle[:, 1] - upper * np.cos(first)
+    joints[:, 1] = middle
+    joints[:, 2, 0] = middle[:, 0] + facing * lower * np.sin(third)
+    joints[:, 2, 1] = middle[:, 1] + lower * np.cos(third)
+    return joints
+
+def _bursts(frames, rate, mean_length, rng):
+    """Boolean mask of frames covered by bursts that start with probability `rate` per frame."""
+    mask = np.zeros(frames, bool)
+    for start in np.flatnonzero(rng.random(frames) < rate):
+        mask[start:start + rng.geometric(1 / mean_length)] = True
+    return mask
+
+def generate(exercise_type="Squat", seconds=60, fps=FPS, people=1, tempo=(1.5, 3.5), noise_px=1.0,
+             occlusion=0.0, occlusion_frames=6, dropout=0.0, dropout_frames=10, partial_reps=0.0,
+             seed=0, name=None):
+    """Generates a synthetic clip.
+
+    `tempo` is the range of seconds per rep, drawn per rep. `noise_px` is the standard
+    deviation of keypoint jitter. `occlusion` is the per-frame chance that one joint of a
+    person becomes hidden for about `occlusion_frames` frames: like ultralytics does for
+    joints under 0.5 confidence, it is reported at (0, 0) with low confidence. `dropout`
+    is the per-frame chance that a person is not detected at all for about
+    `dropout_frames` frames. `partial_reps` is the fraction of reps that stop short of
+    the counting angle and should not be counted.
+    """
+    spec = EXERCISES[exercise_type]
+    rng = np.random.default_rng(seed)
+    frames = int(seconds * fps)
+    tracks, expected, visible = [], [], []
+    for person in range(people):
+        angle, reps = _angle_track(frames, fps, spec, tempo, partial_reps, rng)
+        centre = (WIDTH * (person + 1) / (people + 1), HEIGHT * spec["y"])
+        joints = _joints(angle, spec, centre, rng.uniform(0.8, 1.2), rng.choice([-1, 1]))
+        joints += rng.normal(0, noise_px, joints.shape).astype(np.float32)
+        conf = rng.uniform(0.75, 1.0, (frames, NUM_JOINTS)).astype(np.float32)
+
+        hidden = _bursts(frames, occlusion, occlusion_frames, rng)
+        hidden_joint = rng.integers(0, NUM_JOINTS, frames)
+        for i in np.flatnonzero(hidden):
+            joints[i, hidden_joint[i]] = 0
+            conf[i, hidden_joint[i]] = rng.uniform(0.0, 0.5)
+
+        tracks.append(np.concatenate([joints, conf[..., None]], axis=-1))
+        expected.append(reps)
+        visible.append(~_bursts(frames, dropout, dropout_frames, rng))
+
+    tracks = np.stack(tracks, axis=1)  # (frames, people, joints, 3)
+    visible = np.stack(visible, axis=1)
+    clip_frames = [tracks[i][visible[i]] for i in range(frames)]
+    times_ms = np.arange(frames) * 1000 // fps
+    return PoseClip(name or f"{exercise_type} synthetic", exercise_type, clip_frames, times_ms, expected)
+
+def scenarios(seconds=60, seed=0):
+    """The standard set of synthetic clips the counting benchmark runs, for both exercises."""
+    clips = []
+    for exercise_type in EXERCISES:
+        for label, options in [
+            ("clean", {"noise_px": 0.5}),
+            ("fast tempo", {"tempo": (0.8, 1.4)}),
+            ("slow tempo", {"tempo": (3.0, 6.0)}),
+            ("noisy", {"noise_px": 6.0}),
+            ("partial reps", {"partial_reps": 0.3}),
+            ("occluded", {"occlusion": 0.01}),
+            ("lost detections", {"dropout": 0.005}),
+            ("3 people", {"people": 3}),
+        ]:
+            clips.append(generate(exercise_type, seconds, seed=seed, name=f"{exercise_type} {label}", **options))
+            seed += 1
+    return clips
+
+def load_recorded(db_path, limit=None):
+    """Clips for the sessions saved with a rep event log in a workout database."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(
+            f"SELECT Session_ID, Exercise_Type, Rep_Count FROM {REP_EVENT_TABLE} ORDER BY Session_ID"
+            + (f" LIMIT {int(limit)}" if limit else "")
+        ).fetchall()
+        clips = []
+        for session_id, exercise_type, rep_count in rows:
+            trace = load_session(conn, session_id, traces=True)["trace"]
+            people = np.concatenate([trace["xy"].astype(np.float32), trace["conf"][..., None]], axis=-1)
+            # Frames recorded without a detection hold zero confidence for every joint
+            detected = trace["conf"].any(axis=1)
+            frames = [people[i:i + 1] if detected[i] else people[i:i] for i in range(len(people))]
+            times_ms = np.round(trace["time_s"] * 1000).astype(np.int64)
+            clips.append(PoseClip(f"{exercise_type} session {session_id}", exercise_type, frames, times_ms, [rep_count]))
+        return clips
+    finally:
+        conn.close()
@@ -0,0 +1,213 @@
+import asyncio
+import contextvars
+from pydantic import BaseModel, Field
+from langchain.agents.agent import AgentExecutor
+from langchain.agents.format_scratchpad.openai_tools import format_to_openai_tool_messages
+from langchain.agents.output_parsers.openai_tools import OpenAIToolsAgentOutputParser
+from langchain.chains import create_sql_query_chain
+from langchain.tools import tool
+from langchain_community.vectorstores import FAISS
+from langchain_core.example_selectors import SemanticSimilarityExampleSelector
+from langchain_core.prompts import ChatPromptTemplate, FewShotPromptTemplate, MessagesPlaceholder, PromptTemplate
+from sql_results import run_query, get_result, describe_result, chart_type, chart_frame
+
+# Database the SQL tool queries for the question being answered. Set by ask(), never by
+# the model, so the model's SQL only reads the database of the member the page resolved
+# with tenants.current_user.
+current_db_path = contextvars.ContextVar("current_db_path")
+
+#Few shot prompting
+examples = [
+    {
+        "input": "List all exercise entries.", 
+        "query": "SELECT * FROM exercise_table;"
+    },
+    {
+        "input": "Find all exercise entries on '2024-05-02'.",
+        "query": "SELECT * FROM exercise_table WHERE DATE(Datetime) = '2024-05-02';",
+    },
+    {
+        "input": "List all entries where the exercise count is more than 50.",
+        "query": "SELECT * FROM exercise_table WHERE count > 50;",
+    },
+    {
+        "input": "Find the total number of exercises performed on '2024-05-01'.",
+        "query": "SELECT SUM(count) FROM exercise_table WHERE DATE(Datetime) = '2024-05-01';",
+    },
+    {
+        "input": "List all exercise entries where the type is 'Squat'.",
+        "query": "SELECT * FROM exercise_table WHERE exercise_type = 'Squat';",
+    },
+    {
+        "input": "How many exercise entries are there in total?",
+        "query": "SELECT COUNT(*) FROM exercise_table;",
+    },
+    {
+        "input": "Find the entry with the highest number of exercises recorded.",
+        "query": "SELECT * FROM exercise_table ORDER BY count DESC LIMIT 1;",
+    },
+    {
+        "input": "List all exercise entries from March 2024.",
+        "query": "SELECT * FROM exercise_table WHERE strftime('%Y-%m', Datetime) = '2024-03';",
+    },
+    {
+        "input": "Find the average number of exercises performed across all entries.",
+        "query": "SELECT AVG(count) FROM exercise_table;",
+    },
+    {
+        "input": "How many unique exercise types are recorded?",
+        "query": "SELECT COUNT(DISTINCT exercise_type) FROM exercise_table;",
+    },
+    {
+        "input": "Find the earliest recorded exercise entry.",
+        "query": "SELECT * FROM exercise_table ORDER BY Datetime ASC LIMIT 1;",
+    },
+    {
+        "input": "List all exercise entries on '2024-03-05' where more than 40 reps were performed.",
+        "query": "SELECT * FROM exercise_table WHERE DATE(Datetime) = '2024-03-05' AND count > 40;", 
+    },
+    {
+        "input": "How many times did I do push-ups in 2024?",
+        "query": "SELECT COUNT(*) FROM exercise_table WHERE exercise_type = 'Push Up' AND strftime('%Y', Datetime) = '2024';", 
+    },
+    {
+        "input": "Can you create a bar chart of the total exercises performed per day for May 2024?",
+        "query": "SELECT DATE(Datetime) AS date, SUM(count) AS total_exercises FROM exercise_table WHERE strftime('%Y-%m', Datetime) = '2024-05' GROUP BY DATE(Datetime) ORDER BY DATE(Datetime);", 
+    }
+]
+
+system_prefix = """You are an agent designed to interact with a SQL database.
+Given an input question, create a syntactically correct {dialect} query to run, then look at the results of the query and return the answer.
+\n\n Return ONLY the SQL query, the response should start with SELECT.
+\n\nUnless otherwise specificed, do not return more than {top_k} rows.
+\n\nHere is the relevant table info: {table_info}
+\n\nBelow are a number of examples of questions and their corresponding SQL queries.
+You can order the results by a relevant column to return the most interesting examples in the database.
+Never query for all the columns from a specific table, only ask for the relevant columns given the question.
+You have access to tools for interacting with the database.
+Only use the given tools. Only use the information returned by the tools to construct your final answer.
+You MUST double check your query before executing it. If you get an error while executing a query, rewrite the query and try again.
+
+If you need to filter on a proper noun, you must ALWAYS first look up the filter value using the "search_proper_nouns" tool!
+
+DO NOT make or run any DML statements (INSERT, UPDATE, DELETE, DROP etc.) to the database.
+
+DO NOT use Limit for any queries relating to data visualisation such as a bar graph, line graph or table.
+
+Here are some examples of user inputs and their corresponding SQL queries:"""
+
+example_prompt = PromptTemplate.from_template("User input: {input}\nSQL query: {query}")
+
+class QueryInput(BaseModel):
+    query: str = Field(description="""a natural language question that requires a sql query to be 
+                    run against the exercise_table table, must be the exact same
+                        as the user's original question. DO NOT MODIFY IT""")
+
+class DataInput(BaseModel):
+    handle: str = Field(description="the result handle returned by sql_query_db_tool")
+    graph: str = Field(description= "it must include what type of graph to be produced, \
+                    for instance bar graph, line graph or table")
+
+def build_example_selector(embedding_model, k=5):
+    """Indexes the few-shot examples so the most similar ones can be picked per question."""
+    return SemanticSimilarityExampleSelector.from_examples(
+        examples,
+        embedding_model,
+        FAISS,
+        k=k,
+        input_keys=["input"],
+    )
+
+def build_write_query(llm, db, example_selector):
+    """Chain that turns a natural language question into a SQL query."""
+    prompt = FewShotPromptTemplate(
+        example_selector=example_selector,
+        example_prompt=example_prompt,
+        prefix=system_prefix,
+        suffix="User input: {input}\nSQL query: ",
+        input_variables=["input", "top_k", "table_info"],
+    )
+    return create_sql_query_chain(llm, db, prompt)
+
+def build_agent(gateway, llm, write_query):
+    """Tool-calling agent that answers questions with the SQL and data visualisation tools.
+
+    The agent holds no per-session state, so one instance can serve every session.
+    Charts are not drawn here: the page draws them from the returned intermediate steps.
+    """
+    @tool("sql_query_db_tool", args_schema=QueryInput)
+    async def sql_query_db_tool(query):
+        """Accepts only one input string that contains the user's natural language question and runs a query against on the
+        exercise_db. Returns a result handle, the row count, the columns and a preview of the rows. The full result is kept
+        under the handle for the data visualisation tool. The question should be the exact same as that as the user's original question.
+        """
+        sql = await write_query.ainvoke({"question": query})
+        try:
+            handle, df = await asyncio.to_thread(run_query, sql, current_db_path.get())
+        except Exception as e:
+            return f"Error: {e}"
+        return describe_result(handle, df)
+
+    @tool("data-visualisation-tool", args_schema=DataInput)
+    def data_visualisation_tool(handle: str, graph: str):
+        """Use this tool to visualise a line graph, bar graph or table. Accepts only two input strings, the first containing the result handle
+        returned by sql_query_db_tool and the second, containing the type of graph for data visualisation, and produces a visualisation. This tool 
+        generates a graph in streamlit. This tool must only be run a maximum of one time, even if there is a mistake and should only be run after running the sql_db_query tool"""
+        df = get_result(handle)
+        if df is None:
+            return f"No query result found for handle {handle}."
+
+        # The chart itself is drawn by the page once the agent has finished
+        kind = chart_type(graph)
+        if kind is None or df.empty:
+            return "A graph is incompatible with the query."
+        if kind != "table" and (len(df.columns) < 2 or chart_frame(df) is None):
+            return "A chart needs an x-axis column and at least one numeric y-axis column."
+        return f"Displayed a {kind} of {len(df)} rows."
+
+    tools = [data_visualisation_tool, sql_query_db_tool]
+
+    llm_with_tools = llm.bind_tools(tools)
+
+    prompt = ChatPromptTemplate.from_messages(
+        [
+            (
+                "system",
+                """You are very powerful assistant chatbot to help people exercise healthier. You have access to tools
+                to query a user's exercise database named exercise_table and to turn that data into a visualisation chart. When using sql_query_tool_db, DO NOT MODIFY THE ORIGINAL QUESTION.
+                If the user fails to specify a specific time frame for data visualisation, the default time frame would be per day. For instance,
+                'Create a line chart of the number of squats I did in 2024' should be reformatted to 'Create a line chart of the number of squats I did in 2024 per day'
+                before being passed to sql_query_db_tool. If the user wants to create a data visualisation chart, run sql_query_tool_db first to get
+                the data before running data_visualisation tool to visualise the data. To use data_visualisation_tool, you must give two inputs, one for the 
+                result handle returned by sql_query_db_tool and one for the type of graph. Do not copy the data itself, the tool reads it from the handle.
+                Additionally, if bar chart or line chart or table is required by the user, you must pass the handle into data_visualization tool""",
+            ),
+            ("user", "{input}"),
+            MessagesPlaceholder(variable_name="agent_scratchpad"),
+        ]
+    )
+
+    agent = (
+        {
+            "input": lambda x: x["input"],
+            "agent_scratchpad": lambda x: format_to_openai_tool_messages(
+                x["intermediate_steps"]
+            ),
+        }
+        | prompt
+        | gateway.wrap(llm_with_tools)
+        | OpenAIToolsAgentOutputParser()
+    )
+
+    agent_executor = AgentExecutor(
+        agent=agent,
+        verbose=True,
+        tools=tools,
+        return_intermediate_steps=True
+    )
+    return agent_executor
+
+async def ask(agent_executor, question, db_path):
+    """Answers one question with the SQL tool scoped to the database at `db_path`."""
+    current_db_path.set(db_path)
+    return await agent_executor.ainvoke({"input": question})
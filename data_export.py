@@ -0,0 +1,133 @@
+"""Streaming export and online backup of workout data.
+
+Exports read exercise_table (or the photo metadata) through a SQLite cursor in
+fixed-size chunks and write each chunk out before reading the next, so memory use
+does not grow with the table. Backups use SQLite's online backup API a few pages at
+a time, so the app keeps reading and writing while the copy runs.
+
+Run from the repository root:
+    python -m data_export csv workouts.csv
+    python -m data_export parquet photos.parquet --table photos
+    python -m data_export backup exercise-backup.db
+    python -m data_export csv alice.csv --user alice
+"""
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+import tenants
+
+CHUNK_ROWS = 50000
+FORMATS = ["csv", "parquet", "arrow"]
+
+EXERCISE_COLUMNS = ["ID", "Datetime", "Count", "Exercise_Type"]
+PHOTO_COLUMNS = ["ID", "Path", "Size_Bytes", "Modified"]
+
+def iter_exercise_chunks(conn, chunk_rows=CHUNK_ROWS):
+    """Yields lists of exercise_table rows, at most `chunk_rows` at a time, in ID order."""
+    cursor = conn.execute(f"SELECT {', '.join(EXERCISE_COLUMNS)} FROM exercise_table ORDER BY ID")
+    while rows := cursor.fetchmany(chunk_rows):
+        yield rows
+
+def iter_photo_chunks(conn, chunk_rows=CHUNK_ROWS, photos_dir=tenants.DEFAULT_PHOTOS_FOLDER):
+    """Yields photo metadata rows (ID, path, size, modification time) for entries that have a photo."""
+    for rows in iter_exercise_chunks(conn, chunk_rows):
+        chunk = []
+        for row in rows:
+            path = os.path.join(photos_dir, f"{row[0]}.jpg")
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            chunk.append((row[0], path, stat.st_size, stat.st_mtime))
+        if chunk:
+            yield chunk
+
+def _arrow_schema(columns):
+    import pyarrow as pa
+    types = {"ID": pa.int64(), "Datetime": pa.string(), "Count": pa.int64(), "Exercise_Type": pa.string(),
+             "Path": pa.string(), "Size_Bytes": pa.int64(), "Modified": pa.float64()}
+    return pa.schema([(name, types[name]) for name in columns])
+
+def write_chunks(chunks, columns, path, fmt):
+    """Writes row chunks to `path` as CSV, Parquet (one row group per chunk) or Arrow IPC. Returns the row count."""
+    total = 0
+    if fmt == "csv":
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for rows in chunks:
+                writer.writerows(rows)
+                total += len(rows)
+        return total
+
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError(f"Exporting to {fmt} requires pyarrow (pip install pyarrow)")
+
+    schema = _arrow_schema(columns)
+    if fmt == "parquet":
+        writer = pa.parquet.ParquetWriter(path, schema)
+    else:
+        writer = pa.ipc.new_file(path, schema)
+    with writer:
+        for rows in chunks:
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            total += len(rows)
+    return total
+
+def export(path, fmt="csv", table="exercise", db_path=tenants.DEFAULT_DB_PATH, chunk_rows=CHUNK_ROWS, photos_dir=tenants.DEFAULT_PHOTOS_FOLDER):
+    """Streams exercise_table (`table="exercise"`) or photo metadata (`table="photos"`) to a file."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        if table == "photos":
+            return write_chunks(iter_photo_chunks(conn, chunk_rows, photos_dir), PHOTO_COLUMNS, path, fmt)
+        return write_chunks(iter_exercise_chunks(conn, chunk_rows), EXERCISE_COLUMNS, path, fmt)
+    finally:
+        conn.close()
+
+def backup(dest_path, db_path=tenants.DEFAULT_DB_PATH, pages_per_step=256, sleep=0.005, progress=None):
+    """Copies the live database to `dest_path` with SQLite's online backup API.
+
+    Each step copies `pages_per_step` pages and then sleeps, so other connections can
+    read and write between steps. `progress(status, remaining, total)` is called after
+    every step.
+    """
+    source = sqlite3.connect(db_path)
+    target = sqlite3.connect(dest_path)
+    try:
+        source.backup(target, pages=pages_per_step, progress=progress, sleep=sleep)
+    finally:
+        target.close()
+        source.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=FORMATS + ["backup"])
+    parser.add_argument("path", help="output file")
+    parser.add_argument("--user", default=tenants.DEFAULT_USER, help="member whose data is exported")
+    parser.add_argument("--db", help="database file, instead of the member's")
+    parser.add_argument("--table", choices=["exercise", "photos"], default="exercise")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--pages-per-step", type=int, default=256, help="pages copied per backup step")
+    args = parser.parse_args()
+    db_path = args.db or tenants.db_path(args.user)
+    photos_dir = tenants.photos_dir(args.user)
+
+    if args.command == "backup":
+        def progress(status, remaining, total):
+            print(f"\r🗄️ Backed up {total - remaining}/{total} pages", end="", file=sys.stderr)
+        backup(args.path, db_path, args.pages_per_step, progress=progress)
+        print(file=sys.stderr)
+        return
+
+    rows = export(args.path, args.command, args.table, db_path, args.chunk_rows, photos_dir)
+    print(f"✅ Exported {rows} rows to {args.path}")
+
+if __name__ == "__main__":
+    main()
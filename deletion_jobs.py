@@ -0,0 +1,215 @@
+"""Background deletion of workouts and their photos.
+
+A deletion job runs on its own thread. It deletes rows in bounded batches, each in a
+short transaction, so the tracker and other pages can write between batches. Photos
+are removed by a small worker pool while the next batch is deleted. Freed pages are
+returned with incremental vacuum rather than a full VACUUM. The database runs in WAL
+mode, so readers are never blocked while a job runs.
+
+Pages start a job with start_deletion, keep its ID in session_state["deletion_job"]
+and call show_deletion_progress, which polls get_job until the job ends.
+
+New databases are created with incremental auto-vacuum. One created before that
+keeps its space until it is migrated once, with a full VACUUM, while the app is
+stopped:
+    python -m deletion_jobs migrate
+"""
+import argparse
+import glob
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import tenants
+from rep_events import TABLE as REP_EVENT_TABLE, create_table as create_rep_event_table
+
+BATCH_ROWS = 500  # Rows deleted per transaction
+BATCH_PAUSE = 0.005  # Seconds between batches, so writers waiting on the lock get it
+PHOTO_WORKERS = 4
+VACUUM_PAGES = 256  # Pages released per incremental_vacuum step
+MAX_STORED_JOBS = 20
+
+INCREMENTAL = 2  # PRAGMA auto_vacuum value for incremental auto-vacuum
+
+def migrate(db_path):
+    """Switches an existing database to incremental auto-vacuum and WAL mode.
+
+    Needs one full VACUUM, which rewrites the whole file and blocks every writer
+    while it runs. Returns False if the database was already migrated.
+    """
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == INCREMENTAL:
+            return False
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA journal_mode = WAL")
+        return True
+    finally:
+        conn.close()
+
+class DeletionJob:
+    """Deletes the exercise_table rows matching `where`, their rep events and their photos.
+
+    With `everything=True` the whole table is emptied, its ID sequence reset, and every
+    file in the photos folder removed, including photos no row refers to any more.
+    """
+
+    def __init__(self, where="1=1", params=(), everything=False, db_path=tenants.DEFAULT_DB_PATH, photos_dir=tenants.DEFAULT_PHOTOS_FOLDER):
+        self.id = uuid.uuid4().hex[:8]
+        self.where = where
+        self.params = tuple(params)
+        self.everything = everything
+        self.db_path = db_path
+        self.photos_dir = photos_dir
+        self.stage = "queued"
+        self.total_rows = 0
+        self.rows_deleted = 0
+        self.photos_deleted = 0
+        self.error = None
+        self._photos_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=f"deletion-{self.id}", daemon=True)
+
+    @property
+    def done(self):
+        return self.stage in ("done", "failed")
+
+    @property
+    def progress(self):
+        """Fraction of matching rows deleted so far, from 0 to 1."""
+        if self.done:
+            return 1.0
+        return self.rows_deleted / self.total_rows if self.total_rows else 0.0
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+    def _remove_photo(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        with self._photos_lock:
+            self.photos_deleted += 1
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with ThreadPoolExecutor(max_workers=PHOTO_WORKERS, thread_name_prefix=f"photos-{self.id}") as photos:
+                self.stage = "counting rows"
+                create_rep_event_table(conn)
+                self.total_rows = conn.execute(
+                    f"SELECT COUNT(*) FROM exercise_table WHERE {self.where}", self.params
+                ).fetchone()[0]
+
+                self.stage = "deleting rows"
+                self._delete_rows(conn, photos)
+                if self.everything:
+                    with conn:
+                        conn.execute(f"DELETE FROM {REP_EVENT_TABLE}")  # Event logs of rows deleted earlier
+                        conn.execute("DELETE FROM sqlite_sequence WHERE name='exercise_table'")
+                    if os.path.isdir(self.photos_dir):
+                        for entry in os.scandir(self.photos_dir):
+                            if entry.is_file():
+                                photos.submit(self._remove_photo, entry.path)
+
+                self.stage = "removing photos"
+            self.stage = "vacuuming"
+            self._vacuum(conn)
+            self.stage = "done"
+        except Exception as e:
+            self.error = str(e)
+            self.stage = "failed"
+        finally:
+            conn.close()
+
+    def _delete_rows(self, conn, photos):
+        last_id = -1
+        while True:
+            ids = [row[0] for row in conn.execute(
+                f"SELECT ID FROM exercise_table WHERE ({self.where}) AND ID > ? ORDER BY ID LIMIT ?",
+                self.params + (last_id, BATCH_ROWS)
+            )]
+            if not ids:
+                return
+            placeholders = ", ".join("?" * len(ids))
+            with conn:  # One short transaction per batch
+                conn.execute(f"DELETE FROM {REP_EVENT_TABLE} WHERE Session_ID IN ({placeholders})", ids)
+                conn.execute(f"DELETE FROM exercise_table WHERE ID IN ({placeholders})", ids)
+            self.rows_deleted += len(ids)
+            last_id = ids[-1]
+            if not self.everything:
+                for exercise_id in ids:
+                    photos.submit(self._remove_photo, os.path.join(self.photos_dir, f"{exercise_id}.jpg"))
+            time.sleep(BATCH_PAUSE)
+
+    def _vacuum(self, conn):
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != INCREMENTAL:
+            return  # Not migrated yet; the space is reused by later writes instead
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        while free_pages:
+            conn.execute(f"PRAGMA incremental_vacuum({VACUUM_PAGES})").fetchall()
+            conn.commit()
+            remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if remaining >= free_pages:
+                return
+            free_pages = remaining
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+def start_deletion(where="1=1", params=(), everything=False, db_path=tenants.DEFAULT_DB_PATH, photos_dir=tenants.DEFAULT_PHOTOS_FOLDER):
+    """Starts a deletion job in the background and returns its ID."""
+    job = DeletionJob(where, params, everything, db_path, photos_dir)
+    with _jobs_lock:
+        for job_id in [job_id for job_id, old in _jobs.items() if old.done][:max(0, len(_jobs) - MAX_STORED_JOBS + 1)]:
+            del _jobs[job_id]
+        _jobs[job.id] = job
+    return job.start().id
+
+def get_job(job_id):
+    """Returns the job with this ID, or None if it is unknown."""
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+def show_deletion_progress():
+    """Shows a progress bar for the job in session_state["deletion_job"], refreshing only itself.
+
+    When the job ends it is moved to session_state["deletion_result"] and the whole page
+    reruns, so deleted records disappear.
+    """
+    import streamlit as st
+
+    @st.fragment(run_every=0.5)
+    def progress():
+        job = get_job(st.session_state.get("deletion_job"))
+        if job is not None and not job.done:
+            st.progress(job.progress, text=f"🗑️ {job.stage.capitalize()}: {job.rows_deleted}/{job.total_rows} records")
+            return
+        st.session_state.deletion_job = None
+        st.session_state.deletion_result = job
+        st.rerun()
+    progress()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["migrate"])
+    parser.add_argument("--user", help="member whose database is migrated; default every member")
+    args = parser.parse_args()
+    if args.user:
+        paths = [tenants.db_path(args.user)]
+    else:
+        paths = [tenants.DEFAULT_DB_PATH] + sorted(glob.glob(os.path.join(tenants.TENANTS_FOLDER, "*", "exercise.db")))
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        print(f"✅ Migrated {path}" if migrate(path) else f"{path} is already migrated")
+
+if __name__ == "__main__":
+    main()
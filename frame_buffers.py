@@ -0,0 +1,69 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+
+class FrameRing:
+    """Fixed ring of reusable frame buffers that the webcam reads into.
+
+    Each slot is allocated on first use and then overwritten in place by
+    `cap.read(image=...)`, so a long session stops allocating frames after the first
+    `capacity` reads. Every slot also carries a score, so the best of the most recent
+    frames can be picked when a rep completes.
+    """
+
+    def __init__(self, capacity=8):
+        self._buffers = [None] * capacity
+        self._scores = [-1.0] * capacity
+        self._newest = -1
+
+    def read(self, cap):
+        """Reads the next webcam frame into the oldest slot. Returns (success, frame) like cap.read()."""
+        slot = (self._newest + 1) % len(self._buffers)
+        buffer = self._buffers[slot]
+        success, frame = cap.read() if buffer is None else cap.read(image=buffer)
+        if success:
+            # Same array as `buffer` unless the resolution changed and OpenCV had to reallocate
+            self._buffers[slot] = frame
+            self._scores[slot] = -1.0
+            self._newest = slot
+        return success, frame
+
+    def score(self, value):
+        """Sets the score of the frame read last."""
+        self._scores[self._newest] = value
+
+    def best(self):
+        """Returns (frame, score) for the highest-scored frame currently in the ring."""
+        slot = max(range(len(self._buffers)), key=self._scores.__getitem__)
+        return self._buffers[slot], self._scores[slot]
+
+class SnapshotWriter:
+    """Encodes and writes JPEG snapshots on a background thread so saving never blocks the page."""
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot-writer")
+
+    def submit(self, image, path, quality=90):
+        """Queues `image` to be written to `path`. The image must not be modified afterwards."""
+        return self._executor.submit(self._write, image, path, quality)
+
+    @staticmethod
+    def _write(image, path, quality):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        success, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not success:
+            raise IOError(f"Could not encode snapshot for {path}")
+        encoded.tofile(path)
+        return path
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_snapshot_writer():
+    """Returns the process-wide snapshot writer, creating it on first use."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = SnapshotWriter()
+        return _writer
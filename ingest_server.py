@@ -0,0 +1,217 @@
+"""Central ingest service for capture stations.
+
+Stations run pose inference only and stream keypoints here (see keypoint_protocol).
+The server counts reps with the same logic as the tracker page, records the rep event
+log, and writes finished workouts to SQLite in batches: one transaction per member for
+every workout that finishes within a short window. Each workout goes to the database of
+the member named in the station's HELLO (see tenants), or to one --db file for all.
+
+Stations are trusted: whoever can reach the port can save workouts for any member, so
+listen on the gym's own network only.
+
+Run from the repository root: python -m ingest_server --port 8770
+"""
+import argparse
+import asyncio
+import datetime
+import sqlite3
+import time
+from collections import defaultdict
+import numpy as np
+from keypoint_protocol import (ACK_EVERY, HELLO, FRAME, END, ProtocolError, decode, read_message,
+                               encode_welcome, encode_ack, encode_saved)
+from rep_counter import RepCounter
+from rep_events import RepRecorder, save_session
+import tenants
+
+SESSION_TTL = 600  # Seconds an idle or finished session is kept so a station can resume it
+
+class IngestSession:
+    """Counting state of one station's workout. Survives reconnects of the station."""
+
+    def __init__(self, exercise_type, num_joints, user_id=tenants.DEFAULT_USER):
+        self.user_id = user_id
+        self.exercise_type = exercise_type
+        self.num_joints = num_joints
+        self.counter = RepCounter()
+        self.recorder = RepRecorder(exercise_type, num_joints)
+        self.last_seq = 0
+        self.last_seen = time.monotonic()
+        self.pending = None  # Future of the database write, once END arrived
+        self.saved = None  # (session_id, count) once written
+
+    @property
+    def count(self):
+        return self.counter.count[0] if self.counter.count else 0
+
+    def add_frame(self, time_ms, people):
+        xy = np.stack([people["x"], people["y"]], axis=-1).astype(np.float32)
+        conf = people["conf"].astype(np.float32) / 255
+        self.counter.update(xy)
+        keypoints = (xy[0], conf[0]) if len(xy) else None
+        angle = self.counter.angle[0] if self.counter.angle else None
+        self.recorder.add_frame(time_ms / 1000, self.count, angle, keypoints)
+
+class IngestServer:
+    def __init__(self, db_path=None, host="127.0.0.1", port=8770, batch_size=64, batch_window=0.05):
+        self.db_path = db_path  # None writes each workout to its member's database
+        self.host = host
+        self.port = port
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.sessions = {}  # Session token -> IngestSession
+        self.bytes_received = 0
+        self.batches_written = 0
+        self._writes = asyncio.Queue()
+        self._server = None
+        self._writer_task = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._writer_task = asyncio.create_task(self._write_batches())
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+        self._writer_task.cancel()
+
+    def _prune(self):
+        now = time.monotonic()
+        for token, session in list(self.sessions.items()):
+            if session.pending is None or session.saved is not None:
+                if now - session.last_seen > SESSION_TTL:
+                    del self.sessions[token]
+
+    async def _read(self, reader):
+        body = await read_message(reader)
+        self.bytes_received += len(body) + 2
+        return body
+
+    async def _handle(self, reader, writer):
+        try:
+            kind, hello = decode(await self._read(reader))
+            if kind != HELLO:
+                raise ProtocolError("Expected HELLO")
+            self._prune()
+            try:
+                tenants.validate_user(hello["user_id"])
+            except ValueError as e:
+                raise ProtocolError(str(e)) from None
+            session = self.sessions.get(hello["token"])
+            if session is None:
+                session = self.sessions[hello["token"]] = IngestSession(
+                    hello["exercise_type"], hello["num_joints"], hello["user_id"])
+            writer.write(encode_welcome(session.last_seq))
+            if session.saved is not None:
+                writer.write(encode_saved(*session.saved))
+            await writer.drain()
+
+            while True:
+                kind, message = decode(await self._read(reader), session.num_joints)
+                session.last_seen = time.monotonic()
+                if kind == FRAME:
+                    # Frames replayed after a reconnect may already have been counted
+                    if message["seq"] <= session.last_seq:
+                        continue
+                    session.add_frame(message["time_ms"], message["people"])
+                    session.last_seq = message["seq"]
+                    if session.last_seq % ACK_EVERY == 0:
+                        writer.write(encode_ack(session.last_seq))
+                        await writer.drain()
+                elif kind == END:
+                    writer.write(encode_ack(session.last_seq))
+                    if session.pending is None:
+                        session.pending = asyncio.get_running_loop().create_future()
+                        self._writes.put_nowait((session, session.pending))
+                    try:
+                        session.saved = await session.pending
+                    except Exception as e:
+                        # The station keeps its frames and sends END again after reconnecting
+                        print(f"Could not save workout, closing station connection: {e}")
+                        break
+                    writer.write(encode_saved(*session.saved))
+                    await writer.drain()
+                    break
+                else:
+                    raise ProtocolError(f"Unexpected message type {kind}")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # The station dropped; its session is kept so it can resume
+        except ProtocolError as e:
+            print(f"Closing station connection: {e}")
+        finally:
+            writer.close()
+
+    async def _write_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._writes.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.batch_size and (timeout := deadline - loop.time()) > 0:
+                try:
+                    batch.append(await asyncio.wait_for(self._writes.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                ids = await asyncio.to_thread(self._write, [session for session, _ in batch])
+            except Exception as e:
+                for session, future in batch:
+                    session.pending = None  # The next END queues the write again
+                    future.set_exception(e)
+                continue
+            self.batches_written += 1
+            for (session, future), session_id in zip(batch, ids):
+                future.set_result((session_id, session.count))
+
+    def _write(self, sessions):
+        """Saves a batch of finished workouts, one transaction per database. Returns their exercise_table IDs."""
+        now = datetime.datetime.now()
+        if self.db_path is not None:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                tenants.create_schema(conn)  # For servers started before the app
+                ids = self._insert(conn, sessions, now)
+                conn.commit()
+                return ids
+            finally:
+                conn.close()
+
+        by_member = defaultdict(list)
+        for i, session in enumerate(sessions):
+            by_member[session.user_id].append(i)
+        ids = [None] * len(sessions)
+        for user_id, indexes in by_member.items():
+            with tenants.connection(user_id) as conn:
+                for i, session_id in zip(indexes, self._insert(conn, [sessions[i] for i in indexes], now)):
+                    ids[i] = session_id
+        return ids
+
+    def _insert(self, conn, sessions, now):
+        ids = []
+        for session in sessions:
+            cursor = conn.execute(
+                "INSERT INTO exercise_table (datetime, count, exercise_type) VALUES (?, ?, ?)",
+                (now, session.count, session.exercise_type)
+            )
+            save_session(conn, cursor.lastrowid, session.recorder)
+            ids.append(cursor.lastrowid)
+        return ids
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8770)
+    parser.add_argument("--db", help="save every workout to this database instead of each member's")
+    args = parser.parse_args()
+
+    async def serve():
+        server = IngestServer(args.db, args.host, args.port)
+        await server.start()
+        print(f"Ingest server listening on {server.host}:{server.port}")
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Binary message format between capture stations and the ingest server.
+
+Every message is a little-endian uint16 length followed by the body. The first body
+byte is the message type:
+
+    HELLO   station -> server  version u8, exercise u8, joints u8, session token (16 bytes),
+                               member ID (64 bytes ASCII, zero padded)
+    WELCOME server -> station  last frame seq the server already has (u32), for resuming
+    FRAME   station -> server  seq u32, time since session start in ms u32, people u8,
+                               then per person and joint: x i16, y i16, confidence u8
+    ACK     server -> station  highest frame seq received (u32)
+    END     station -> server  last frame seq (u32)
+    SAVED   server -> station  exercise_table ID (u32), reps counted (u32)
+
+A frame with one person and three joints is 17 bytes including its length prefix. The
+server acknowledges at least every ACK_EVERY frames, so a station must be able to keep
+that many unacknowledged frames.
+"""
+import struct
+import numpy as np
+from rep_counter import keypoints_dict
+
+VERSION = 2
+ACK_EVERY = 30  # Frames between acknowledgements, about one per second at 30 fps
+HELLO, WELCOME, FRAME, ACK, END, SAVED = range(1, 7)
+EXERCISES = ["Squat", "Push Up"]
+
+_LENGTH = struct.Struct("<H")
+_HELLO = struct.Struct("<BBBB16s64s")
+_FRAME = struct.Struct("<BIIB")
+_U32 = struct.Struct("<BI")
+_SAVED = struct.Struct("<BII")
+JOINT = np.dtype([("x", "<i2"), ("y", "<i2"), ("conf", "u1")])
+
+class ProtocolError(Exception):
+    pass
+
+def _envelope(body):
+    return _LENGTH.pack(len(body)) + body
+
+def encode_hello(exercise_type, num_joints, token, user_id):
+    return _envelope(_HELLO.pack(HELLO, VERSION, EXERCISES.index(exercise_type), num_joints, token,
+                                 user_id.encode("ascii")))
+
+def encode_welcome(last_seq):
+    return _envelope(_U32.pack(WELCOME, last_seq))
+
+def encode_frame(seq, time_ms, people):
+    """`people` is an array of shape (people, joints, 3) holding x, y and confidence (0-1)."""
+    people = np.asarray(people, dtype=np.float32)
+    joints = np.empty(people.shape[:2], JOINT)
+    joints["x"] = np.clip(np.round(people[..., 0]), -32768, 32767)
+    joints["y"] = np.clip(np.round(people[..., 1]), -32768, 32767)
+    joints["conf"] = np.clip(np.round(people[..., 2] * 255), 0, 255)
+    return _envelope(_FRAME.pack(FRAME, seq, time_ms, len(people)) + joints.tobytes())
+
+def encode_ack(seq):
+    return _envelope(_U32.pack(ACK, seq))
+
+def encode_end(last_seq):
+    return _envelope(_U32.pack(END, last_seq))
+
+def encode_saved(session_id, count):
+    return _envelope(_SAVED.pack(SAVED, session_id, count))
+
+def decode(body, num_joints=None):
+    """Decodes a message body (without its length prefix) into (type, fields).
+
+    Raises ProtocolError for anything malformed: an empty or wrongly sized body, an
+    unknown message type or exercise, a joint count the exercise is not tracked with,
+    or a frame whose size does not match its people.
+    """
+    if not body:
+        raise ProtocolError("Empty message")
+    kind = body[0]
+    if kind == HELLO:
+        _expect_size(body, _HELLO.size, "HELLO")
+        _, version, exercise, joints, token, user_id = _HELLO.unpack(body)
+        if version != VERSION:
+            raise ProtocolError(f"Unsupported protocol version {version}")
+        if exercise >= len(EXERCISES):
+            raise ProtocolError(f"Unknown exercise {exercise}")
+        if joints != len(keypoints_dict[EXERCISES[exercise]]):
+            raise ProtocolError(f"{EXERCISES[exercise]} is tracked with {len(keypoints_dict[EXERCISES[exercise]])} joints, not {joints}")
+        try:
+            user_id = user_id.rstrip(b"\0").decode("ascii")
+        except UnicodeDecodeError:
+            raise ProtocolError("Member ID is not ASCII") from None
+        return kind, {"exercise_type": EXERCISES[exercise], "num_joints": joints, "token": token, "user_id": user_id}
+    if kind == FRAME:
+        if num_joints is None:
+            raise ProtocolError("FRAME before HELLO")
+        if len(body) < _FRAME.size:
+            raise ProtocolError("Truncated FRAME")
+        _, seq, time_ms, count = _FRAME.unpack_from(body)
+        _expect_size(body, _FRAME.size + count * num_joints * JOINT.itemsize, "FRAME")
+        joints = np.frombuffer(body, JOINT, offset=_FRAME.size).reshape(count, num_joints)
+        return kind, {"seq": seq, "time_ms": time_ms, "people": joints}
+    if kind in (WELCOME, ACK, END):
+        _expect_size(body, _U32.size, "sequence message")
+        return kind, {"seq": _U32.unpack(body)[1]}
+    if kind == SAVED:
+        _expect_size(body, _SAVED.size, "SAVED")
+        _, session_id, count = _SAVED.unpack(body)
+        return kind, {"session_id": session_id, "count": count}
+    raise ProtocolError(f"Unknown message type {kind}")
+
+def _expect_size(body, size, name):
+    if len(body) != size:
+        raise ProtocolError(f"{name} is {len(body)} bytes, expected {size}")
+
+async def read_message(reader):
+    """Reads one message body from an asyncio stream. Raises IncompleteReadError when the peer goes away."""
+    (length,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+    return await reader.readexactly(length)
@@ -0,0 +1,79 @@
+import asyncio
+import hashlib
+import os
+import threading
+import httpx
+from langchain_core.runnables import RunnableLambda
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))  # Upstream requests allowed in flight at once
+MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+REQUEST_TIMEOUT = 120.0
+
+class LLMGateway:
+    """Process-wide gateway that every chat session sends its LLM work through.
+
+    All calls run on one event loop in a background thread and share pooled HTTP
+    connections. At most MAX_CONCURRENCY upstream requests are in flight, and identical
+    requests that are already in flight are coalesced into one.
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, max_connections=MAX_CONNECTIONS):
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.http_async_client = httpx.AsyncClient(limits=limits, timeout=REQUEST_TIMEOUT)
+        self.http_client = httpx.Client(limits=limits, timeout=REQUEST_TIMEOUT)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._in_flight = {}  # Request key -> task, only touched on the gateway loop
+        self.upstream_requests = 0
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="llm-gateway", daemon=True)
+        self._thread.start()
+
+    def chat_model(self, **kwargs):
+        """ChatOpenAI that uses the gateway's pooled connections."""
+        return ChatOpenAI(http_client=self.http_client, http_async_client=self.http_async_client, **kwargs)
+
+    def embeddings(self, **kwargs):
+        """OpenAIEmbeddings that uses the gateway's pooled connections."""
+        return OpenAIEmbeddings(http_client=self.http_client, http_async_client=self.http_async_client, **kwargs)
+
+    def run(self, coro, timeout=None):
+        """Runs a coroutine on the gateway loop and blocks the calling (script) thread until it finishes."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    def wrap(self, runnable):
+        """Runnable that calls `runnable` under the concurrency limit, sharing identical in-flight calls."""
+        async def call(value):
+            key = hashlib.sha256(repr(value).encode()).hexdigest()
+            return await self._coalesced(key, lambda: runnable.ainvoke(value))
+
+        def call_sync(value):
+            return self.run(call(value))
+
+        return RunnableLambda(call_sync, afunc=call)
+
+    async def _coalesced(self, key, factory):
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._limited(factory))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # Shield so one caller being cancelled does not cancel the request for the others
+        return await asyncio.shield(task)
+
+    async def _limited(self, factory):
+        async with self._semaphore:
+            self.upstream_requests += 1
+            return await factory()
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+def get_gateway():
+    """Returns the process-wide gateway, creating it on first use."""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = LLMGateway()
+        return _gateway
@@ -1,28 +1,8 @@
-import sqlite3
-import os
 import altair as alt
 import streamlit as st
 import pandas as pd
-from langchain_openai import ChatOpenAI
-from langchain_community.utilities import SQLDatabase
-
-# Initialize database
-def initialize_db():
-    conn = sqlite3.connect("exercise.db")
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS exercise_table (
-                        ID INTEGER PRIMARY KEY AUTOINCREMENT,
-                        Datetime DATETIME,
-                        Count INTEGER,
-                        Exercise_Type TEXT)''')
-    conn.commit()
-    conn.close()
-
-initialize_db()
-
-def start_sql_db():
-    db = SQLDatabase.from_uri("sqlite:///exercise.db")
-    return db
+import resources
+import tenants
 
 # Set page title and layout
 st.set_page_config(page_title="VisionFit: Smart Exercise Tracker", layout="wide")
@@ -34,18 +14,13 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-# Initialize the database
-db = start_sql_db()
-
 # Sidebar for filters
+user_id = tenants.current_user()
 st.sidebar.title("Filters")
 
-# Fetch data from database
-conn = sqlite3.connect("exercise.db")
-cursor = conn.cursor()
-cursor.execute("SELECT * FROM exercise_table ORDER BY Datetime;")
-data = cursor.fetchall()
-conn.close()
+# Fetch the member's data; their database is created with the schema on first use
+with tenants.connection(user_id) as conn:
+    data = conn.execute("SELECT ID, Datetime, Count, Exercise_Type FROM exercise_table ORDER BY Datetime;").fetchall()
 
 # Define column names
 df = pd.DataFrame(data, columns=["ID", "Datetime", "Count", "Exercise_Type"])
@@ -113,13 +88,10 @@ if not df.empty:
     
 if not df_grouped.empty:
     # Set up OpenAI API key and model
-    try:
-        open_ai_key = os.getenv("OPENAI_KEY")
-    except:
+    if not resources.openai_key_configured():
         st.write("To use the AI Personal Trainer, please include your Open AI key in a .env file")
     else:
-        os.environ["OPENAI_API_KEY"] = open_ai_key
-        llm = ChatOpenAI(model="gpt-4o", temperature=0)
+        llm = resources.gated_chat_model()
 
         # Convert recent exercise data to a dictionary format
         recent_exercise_data = df_display.to_dict(orient="records")
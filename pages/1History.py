@@ -1,16 +1,16 @@
 import os
-import sqlite3
 import streamlit as st
 import pandas as pd
 from datetime import datetime
+import tenants
+from deletion_jobs import start_deletion, show_deletion_progress
 
 # Set page title
 st.set_page_config(page_title="Exercise History", layout="wide")
 
 # Database connection function
-def fetch_data(filters):
-    """Fetches filtered exercise data from the database."""
-    conn = sqlite3.connect("exercise.db")
+def fetch_data(user_id, filters):
+    """Fetches the member's filtered exercise data from their database."""
     query = "SELECT * FROM exercise_table WHERE 1=1"
     params = []
     
@@ -33,65 +33,39 @@ def fetch_data(filters):
     
     query += " ORDER BY Datetime DESC"
     
-    df = pd.read_sql_query(query, conn, params=params)
-    conn.close()
+    with tenants.connection(user_id) as conn:
+        df = pd.read_sql_query(query, conn, params=params)
     
     return df
 
-def delete_data(filters):
-    """Deletes exercise data and associated photos based on filters."""
-    conn = sqlite3.connect("exercise.db")
-    cursor = conn.cursor()
-    
-    # Fetch IDs of records to delete (to remove associated photos)
-    select_query = "SELECT ID FROM exercise_table WHERE 1=1"
-    delete_query = "DELETE FROM exercise_table WHERE 1=1"
+def delete_data(user_id, filters):
+    """Starts a background job deleting the member's filtered exercise data and photos. Returns its ID, or None without filters."""
+    where = "1=1"
     params = []
 
     if filters["start_date"]:
-        select_query += " AND Datetime >= ?"
-        delete_query += " AND Datetime >= ?"
+        where += " AND Datetime >= ?"
         params.append(filters["start_date"])
     
     if filters["end_date"]:
-        select_query += " AND Datetime <= ?"
-        delete_query += " AND Datetime <= ?"
+        where += " AND Datetime <= ?"
         params.append(filters["end_date"])
     
     if filters["exercise_type"]:
-        select_query += " AND exercise_Type = ?"
-        delete_query += " AND exercise_Type = ?"
+        where += " AND exercise_Type = ?"
         params.append(filters["exercise_type"])
     
     if filters["exercise_id"]:
-        select_query += " AND ID = ?"
-        delete_query += " AND ID = ?"
+        where += " AND ID = ?"
         params.append(filters["exercise_id"])
 
-    # Fetch records to delete
-    cursor.execute(select_query, params)
-    records_to_delete = cursor.fetchall()
-
-    # Delete corresponding photos
-    for record in records_to_delete:
-        exercise_id = record[0]  # Extract ID
-        photo_path = os.path.join("Photos", f"{exercise_id}.jpg")
-        if os.path.exists(photo_path):
-            os.remove(photo_path)
-            print(f"🗑️ Deleted photo: {photo_path}")
-
-    # Only execute DELETE if there are filters (to prevent accidental full table deletion)
-    if params:
-        cursor.execute(delete_query, params)
-        deleted_rows = cursor.rowcount  # Number of deleted records
-        conn.commit()
-    else:
-        deleted_rows = 0  # No deletion happened
-
-    conn.close()
-    return deleted_rows
+    # Only delete if there are filters (to prevent accidental full table deletion)
+    if not params:
+        return None
+    return start_deletion(where, params, db_path=tenants.ensure_db(user_id), photos_dir=tenants.photos_dir(user_id))
 
 # Sidebar for filters
+user_id = tenants.current_user()
 st.sidebar.title("🔍 Search Exercise History")
 
 # Date filter
@@ -116,7 +90,7 @@ filters = {
     "exercise_id": exercise_id.strip() if exercise_id.isdigit() else None
 }
 
-df = fetch_data(filters)
+df = fetch_data(user_id, filters)
 
 # UI Header
 st.markdown("<h1 style='text-align: center; color: #007BFF;'>📜 Exercise History</h1>", unsafe_allow_html=True)
@@ -136,7 +110,7 @@ if not df.empty:
     photo_found = False  # Flag to check if at least one photo exists
 
     for exercise_id in df["ID"]:
-        photo_path = os.path.join("Photos", f"{exercise_id}.jpg")
+        photo_path = os.path.join(tenants.photos_dir(user_id), f"{exercise_id}.jpg")
         if os.path.exists(photo_path):
             col1, col2, col3 = st.columns([1, 2, 1])  # Creates three columns
             with col2:  # Use the middle column
@@ -159,9 +133,8 @@ if not df.empty:
         col1, col2 = st.columns(2)
         with col1:
             if st.button("✅ Yes, Delete"):
-                deleted_count = delete_data(filters)
+                st.session_state.deletion_job = delete_data(user_id, filters)
                 st.session_state.confirm_delete = False  # Reset flag
-                st.success(f"🗑️ Successfully deleted {deleted_count} records.")
                 st.rerun()
         with col2:
             if st.button("❌ Cancel"):
@@ -171,6 +144,16 @@ else:
     st.write("### 🚨 No matching records found.")
     st.write("Try adjusting your filters to find relevant exercises.")
 
+if st.session_state.get("deletion_job"):
+    show_deletion_progress()
+
+deletion_result = st.session_state.pop("deletion_result", None)
+if deletion_result is not None:
+    if deletion_result.error:
+        st.error(f"❌ Deletion failed: {deletion_result.error}")
+    else:
+        st.success(f"🗑️ Successfully deleted {deletion_result.rows_deleted} records and {deletion_result.photos_deleted} photos.")
+
 # Footer
 st.markdown("""
     <style>
@@ -1,71 +1,94 @@
 import cv2
 import streamlit as st
-import sqlite3
 import datetime
 import os
-from ultralytics import solutions, YOLO
-
-# Initialize YOLO model
-model = YOLO("yolo11n-pose.pt")
-
-# Define keypoints for different exercises
-keypoints_dict = {"Squat": [5, 11, 13], "Push Up": [5, 7, 9]}
-
-def save_workout(count, workout_type):
-    """Save workout data to the database."""
-    conn = sqlite3.connect("exercise.db")
-    cursor = conn.cursor()
-    now = datetime.datetime.now()
-    cursor.execute(
-        "INSERT INTO exercise_table (datetime, count, exercise_type) VALUES (?, ?, ?)",
-        (now, count, workout_type)
-    )
-    session_id = cursor.lastrowid  # Get session ID
-    conn.commit()
-    conn.close()
+import time
+import numpy as np
+import resources
+import tenants
+from frame_buffers import get_snapshot_writer
+from rep_events import person_keypoints, save_session
+from rep_counter import keypoints_dict, DOWN_ANGLE
+from workout_loop import WorkoutLoop
+
+def save_workout(user_id, count, workout_type, recorder=None):
+    """Save workout data, and the per-rep event log if one was recorded, to the member's database."""
+    with tenants.connection(user_id) as conn:
+        now = datetime.datetime.now()
+        cursor = conn.execute(
+            "INSERT INTO exercise_table (datetime, count, exercise_type) VALUES (?, ?, ?)",
+            (now, count, workout_type)
+        )
+        session_id = cursor.lastrowid  # Get session ID
+        if recorder is not None:
+            save_session(conn, session_id, recorder)
     return session_id
 
-def save_frame(image, session_id):
-    """Save a snapshot of the best frame from the workout."""
-    photos_dir = "Photos"
-    os.makedirs(photos_dir, exist_ok=True)
-    image_path = os.path.join(photos_dir, f"{session_id}.jpg")
-    cv2.imwrite(image_path, image)
+def save_frame(user_id, image, session_id):
+    """Save a snapshot of the best frame from the workout.
+
+    The JPEG is written in the background; its future is kept in session_state so a
+    failed write is reported on the next rerun (see report_snapshot_failure).
+    """
+    image_path = os.path.join(tenants.photos_dir(user_id), f"{session_id}.jpg")
+    def report_failure(future):
+        if future.exception() is not None:
+            print(f"Error saving snapshot {image_path}: {future.exception()}")
+
+    future = get_snapshot_writer().submit(image, image_path)
+    future.add_done_callback(report_failure)
+    st.session_state.snapshot_write = (future, image_path)
     return image_path
 
+def report_snapshot_failure():
+    """Shows an error if the last background snapshot write has failed."""
+    pending = st.session_state.get("snapshot_write")
+    if pending is None or not pending[0].done():
+        return
+    future, image_path = pending
+    st.session_state.snapshot_write = None
+    if future.exception() is not None:
+        st.error(f"❌ The workout picture could not be saved to {image_path}: {future.exception()}")
+
 def start_workout(workout_type):
     """Start real-time workout detection."""
     st.session_state.data_saved = False
     st.session_state.workout_count = 0
     st.session_state.best_frame = None
     st.session_state.workout_type = workout_type
+    st.session_state.rep_recorder = None
 
     cap = cv2.VideoCapture(0)
     if not cap.isOpened():
         st.error("❌ Error accessing webcam")
         return
 
-    gym = solutions.AIGym(show=False, kpts=keypoints_dict[workout_type], model="yolo11n-pose.pt", line_width=2, verbose=False, down_angle = 100.0)
+    # ultralytics (and torch) are only imported when the first workout starts
+    solutions = resources.pose_solutions()
+    gym = solutions.AIGym(show=False, kpts=keypoints_dict[workout_type], model=resources.POSE_MODEL, line_width=2, verbose=False, down_angle = DOWN_ANGLE)
 
-    best_frame = None
+    loop = WorkoutLoop(workout_type, num_joints=len(keypoints_dict[workout_type]))
+    display = None
 
     # Create window and set it to always be on top
     cv2.namedWindow("Workout Counter", cv2.WINDOW_NORMAL)
     cv2.setWindowProperty("Workout Counter", cv2.WND_PROP_TOPMOST, 1)
 
     while cap.isOpened():
-        success, frame = cap.read()
+        success, frame = loop.ring.read(cap)
         if not success:
             st.write("⚠️ Error reading frame from webcam.")
             break
 
         frame = gym.monitor(frame)
-        st.session_state.workout_count = gym.count[0]
-        if best_frame is None and gym.count[0] == 1:
-            best_frame = frame.copy()
+        st.session_state.workout_count = loop.step(gym, person_keypoints(gym), time.monotonic())
 
-        cv2.putText(frame, "Press 'Q' to Exit", (30, 50), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 0), 3)
-        cv2.imshow("Workout Counter", frame)
+        # Draw the hint on a separate buffer so frames kept as snapshots stay clean
+        if display is None or display.shape != frame.shape:
+            display = np.empty_like(frame)
+        np.copyto(display, frame)
+        cv2.putText(display, "Press 'Q' to Exit", (30, 50), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 0), 3)
+        cv2.imshow("Workout Counter", display)
         cv2.setWindowProperty("Workout Counter", cv2.WND_PROP_TOPMOST, 1)  # Keep forcing it on top
 
         if cv2.waitKey(1) & 0xFF == ord('q'):
@@ -73,13 +96,16 @@ def start_workout(workout_type):
 
     cap.release()
     cv2.destroyAllWindows()
-    st.session_state.best_frame = best_frame
+    st.session_state.best_frame = loop.best_frame
+    st.session_state.rep_recorder = loop.recorder
 
 def main():
     st.set_page_config(page_title="Workout Tracker", layout="centered")
     st.title("🏋️ AI-Powered Workout Counter")
     st.markdown("Track your exercises in real-time using AI-powered detection.")
     st.warning("⚠️ Ensure that your body can be fully seen throughout the session for accurate counting.")
+    user_id = tenants.current_user()
+    report_snapshot_failure()
     
     # Initialize session state variables if not present
     if "workout_count" not in st.session_state:
@@ -90,6 +116,8 @@ def main():
         st.session_state.workout_type = None
     if "best_frame" not in st.session_state:
         st.session_state.best_frame = None
+    if "rep_recorder" not in st.session_state:
+        st.session_state.rep_recorder = None
     
     col1, col2 = st.columns(2)
     with col1:
@@ -104,16 +132,18 @@ def main():
         
         if st.button("Save Workout"):
             session_id = save_workout(
+                user_id,
                 st.session_state.workout_count,
-                st.session_state.workout_type.title()
+                st.session_state.workout_type.title(),
+                st.session_state.rep_recorder
             )
             st.session_state.data_saved = True
             st.write("✅ Workout data saved!")
             
             if st.session_state.best_frame is not None:
-                img_path = save_frame(st.session_state.best_frame, session_id)
+                save_frame(user_id, st.session_state.best_frame, session_id)
                 st.write("📸 Here is a picture of your exercise workout")
-                st.image(img_path, caption="Workout Snapshot", use_container_width=True)
+                st.image(st.session_state.best_frame, channels="BGR", caption="Workout Snapshot", use_container_width=True)
                 
 if __name__ == "__main__":
     main()
@@ -1,24 +1,16 @@
 import streamlit as st
-import sqlite3
 import random
-import os
 from datetime import datetime, timedelta
-import shutil
-
-PHOTOS_FOLDER = "Photos"  # Folder containing images
-
-def add_manual_entry(exercise_type, count, datetime_str):
-    conn = sqlite3.connect("exercise.db")
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO exercise_table (Datetime, Count, exercise_Type) VALUES (?, ?, ?)",
-                   (datetime_str, count, exercise_type))
-    conn.commit()
-    conn.close()
-
-def add_random_entries(num_entries):
-    conn = sqlite3.connect("exercise.db")
-    cursor = conn.cursor()
-    
+import tenants
+from deletion_jobs import start_deletion, show_deletion_progress
+
+def add_manual_entry(user_id, exercise_type, count, datetime_str):
+    with tenants.connection(user_id) as conn:
+        conn.execute("INSERT INTO exercise_table (Datetime, Count, exercise_Type) VALUES (?, ?, ?)",
+                     (datetime_str, count, exercise_type))
+
+def add_random_entries(user_id, num_entries):
+    rows = []
     for _ in range(num_entries):
         random_days_ago = random.randint(0, 365)
         random_time = random.randint(9 * 60, 22 * 60)
@@ -26,38 +18,20 @@ def add_random_entries(num_entries):
         formatted_datetime = random_datetime.strftime("%Y-%m-%d %H:%M:%S.%f")
         count = random.randint(1, 40)
         exercise_type = random.choice(["Squat", "Push Up"])
-        cursor.execute("INSERT INTO exercise_table (Datetime, Count, exercise_Type) VALUES (?, ?, ?)",
-                       (formatted_datetime, count, exercise_type))
-    
-    conn.commit()
-    conn.close()
-
-def delete_all_entries_and_photos():
-    conn = sqlite3.connect("exercise.db")
-    cursor = conn.cursor()
-    cursor.execute("PRAGMA foreign_keys = ON;")
-    try:
-        cursor.execute("DELETE FROM exercise_table")
-        cursor.execute("DELETE FROM sqlite_sequence WHERE name='exercise_table'")
-        conn.commit()
-        cursor.execute("VACUUM")  # Optimize database after deletion
-    except sqlite3.Error as e:
-        print("Error:", e)
-        conn.rollback()
-    finally:
-        conn.close()
-
-    if os.path.exists(PHOTOS_FOLDER):
-        try:
-            shutil.rmtree(PHOTOS_FOLDER)
-            os.makedirs(PHOTOS_FOLDER)  # Recreate the empty folder
-        except Exception as e:
-            print("Error deleting photos:", e)
+        rows.append((formatted_datetime, count, exercise_type))
+
+    with tenants.connection(user_id) as conn:
+        conn.executemany("INSERT INTO exercise_table (Datetime, Count, exercise_Type) VALUES (?, ?, ?)", rows)
+
+def delete_all_entries_and_photos(user_id):
+    """Starts a background job emptying the member's database and photos folder. Returns its ID."""
+    return start_deletion(everything=True, db_path=tenants.ensure_db(user_id), photos_dir=tenants.photos_dir(user_id))
 
 st.set_page_config(page_title="Exercise Tracker", layout="centered")
 st.title("🏋️ Exercise Tracker Dashboard")
 
 st.markdown("### Manage your exercise records with ease!")
+user_id = tenants.current_user()
 
 st.subheader("📝 Add Manual Entry")
 col1, col2 = st.columns(2)
@@ -75,7 +49,7 @@ st.session_state.time_selected = time_selected
 selected_datetime = datetime.combine(date_selected, time_selected).strftime("%Y-%m-%d %H:%M:%S.%f")
 
 if st.button("➕ Add Entry", use_container_width=True):
-    add_manual_entry(exercise_type, count, selected_datetime)
+    add_manual_entry(user_id, exercise_type, count, selected_datetime)
     st.success(f"✅ Added: {exercise_type} - {count} counts on {selected_datetime}")
 
 st.markdown("---")
@@ -92,7 +66,7 @@ if st.button("Generate Random Data", use_container_width=True):
 
 if st.session_state.get("confirm_random", False):
     if st.button("Yes, generate random data"):
-        add_random_entries(num_entries)
+        add_random_entries(user_id, num_entries)
         st.session_state.random_success = True
         st.session_state.confirm_random = False
 
@@ -110,9 +84,19 @@ if st.button("Delete All Data and Photos", use_container_width=True, key="delete
 
 if st.session_state.get("confirm_delete", False):
     if st.button("Yes, delete everything"):
-        delete_all_entries_and_photos()
-        st.session_state.delete_success = True
+        st.session_state.deletion_job = delete_all_entries_and_photos(user_id)
+        st.session_state.delete_success = False
         st.session_state.confirm_delete = False
 
+if st.session_state.get("deletion_job"):
+    show_deletion_progress()
+
+deletion_result = st.session_state.pop("deletion_result", None)
+if deletion_result is not None:
+    st.session_state.delete_success = deletion_result.error is None
+    st.session_state.delete_error = deletion_result.error
+
 if st.session_state.delete_success:
-    st.warning("🗑️ All records and photos deleted successfully!")
\ No newline at end of file
+    st.warning("🗑️ All records and photos deleted successfully!")
+elif st.session_state.get("delete_error"):
+    st.error(f"❌ Deletion failed: {st.session_state.delete_error}")
\ No newline at end of file
@@ -0,0 +1,46 @@
+"""Rep counting from pose keypoints, without a model.
+
+Mirrors the angle and up/down stage logic AIGym applies to the keypoints it detects,
+so keypoints produced elsewhere (a capture station, a recorded or synthetic clip)
+are counted exactly as the tracker page counts them.
+"""
+import math
+
+# Keypoint indices (COCO order) of the joint angle tracked for each exercise
+keypoints_dict = {"Squat": [5, 11, 13], "Push Up": [5, 7, 9]}
+DOWN_ANGLE = 100.0  # A rep is counted when the angle drops below this after being "up"
+UP_ANGLE = 145.0  # AIGym's default
+
+def joint_angle(a, b, c):
+    """Angle in degrees at `b` between the segments to `a` and `c`, as ultralytics estimate_pose_angle."""
+    radians = math.atan2(c[1] - b[1], c[0] - b[0]) - math.atan2(a[1] - b[1], a[0] - b[0])
+    angle = abs(radians * 180.0 / math.pi)
+    return 360 - angle if angle > 180.0 else angle
+
+class RepCounter:
+    """Per-person rep counts for one exercise, updated one frame at a time."""
+
+    def __init__(self, down_angle=DOWN_ANGLE, up_angle=UP_ANGLE):
+        self.down_angle = down_angle
+        self.up_angle = up_angle
+        self.count = []
+        self.angle = []
+        self.stage = []
+
+    def update(self, people):
+        """Updates the counts from a frame's joints, one sequence of three (x, y) points per person."""
+        if len(people) > len(self.count):
+            new_people = len(people) - len(self.count)
+            self.count += [0] * new_people
+            self.angle += [0.0] * new_people
+            self.stage += ["-"] * new_people
+
+        for i, joints in enumerate(people):
+            self.angle[i] = joint_angle(*joints[:3])
+            if self.angle[i] < self.down_angle:
+                if self.stage[i] == "up":
+                    self.count[i] += 1
+                self.stage[i] = "down"
+            elif self.angle[i] > self.up_angle:
+                self.stage[i] = "up"
+        return self.count
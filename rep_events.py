@@ -0,0 +1,200 @@
+"""Per-rep event log for workout sessions.
+
+Each saved session gets one row in rep_event_table, linked to exercise_table by
+Session_ID. Summary columns (reps, duration, tempo, range of motion) can be aggregated
+in SQL without touching the arrays. The arrays are stored as compressed blobs in
+separate columns, so a query only decodes what it selects:
+
+- Rep_Data: per rep, completion time (ms since start) and min/max joint angle. A rep
+  is counted on the way down, so its angle range runs until the angle is back above
+  the up angle, which takes in the bottom of the rep.
+- Trace_Data: per frame, time (ms), angle and the keypoints_dict joints as int16
+  pixel coordinates plus uint8 confidence. Times and coordinates are delta-encoded
+  before compression, which keeps a few minutes of tracking in the tens of KB.
+"""
+import io
+import zlib
+import numpy as np
+import pandas as pd
+from rep_counter import UP_ANGLE
+
+TABLE = "rep_event_table"
+
+def create_table(conn):
+    conn.execute(f'''CREATE TABLE IF NOT EXISTS {TABLE} (
+                        Session_ID INTEGER PRIMARY KEY REFERENCES exercise_table(ID),
+                        Exercise_Type TEXT,
+                        Rep_Count INTEGER,
+                        Frame_Count INTEGER,
+                        Duration_S REAL,
+                        Mean_Tempo_S REAL,
+                        Mean_ROM_Deg REAL,
+                        Rep_Data BLOB,
+                        Trace_Data BLOB)''')
+
+def _pack(**arrays):
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    return zlib.compress(buffer.getvalue(), 6)
+
+def _unpack(blob):
+    with np.load(io.BytesIO(zlib.decompress(blob))) as data:
+        return {name: data[name] for name in data.files}
+
+def person_keypoints(gym):
+    """Pixel coordinates (n, 2) and confidences (n,) of the exercise joints for the person counted first.
+
+    Reads the prediction AIGym.monitor just made. AIGym counts people in reverse
+    detection order, so count[0] belongs to the last detection. Returns None if nobody
+    was detected.
+    """
+    results = getattr(getattr(gym.model, "predictor", None), "results", None)
+    if not results or results[0].keypoints is None or len(results[0].keypoints.data) == 0:
+        return None
+    joints = results[0].keypoints.data[-1, [int(k) for k in gym.kpts]].cpu().numpy()
+    return joints[:, :2], joints[:, 2]
+
+class RepRecorder:
+    """Collects per-frame traces and per-rep events during one workout."""
+
+    def __init__(self, exercise_type, num_joints=3, initial_frames=1024, up_angle=UP_ANGLE):
+        self.exercise_type = exercise_type
+        self.up_angle = up_angle
+        self._start = None
+        self._frames = 0
+        self._times = np.zeros(initial_frames, np.float64)
+        self._angles = np.zeros(initial_frames, np.float32)
+        self._xy = np.zeros((initial_frames, num_joints, 2), np.float32)
+        self._conf = np.zeros((initial_frames, num_joints), np.float32)
+        self._rep_times = []
+        self._rep_min = []
+        self._rep_max = []
+        self._last_count = 0
+        self._open_rep = None  # Completion time of a counted rep whose angle range is still open
+        self._angle_min = np.inf
+        self._angle_max = -np.inf
+
+    def _grow(self):
+        self._times = np.resize(self._times, len(self._times) * 2)
+        self._angles = np.resize(self._angles, len(self._angles) * 2)
+        self._xy = np.resize(self._xy, (len(self._xy) * 2,) + self._xy.shape[1:])
+        self._conf = np.resize(self._conf, (len(self._conf) * 2,) + self._conf.shape[1:])
+
+    def add_frame(self, timestamp, count, angle=None, keypoints=None):
+        """Records one frame. A rep is logged whenever `count` goes up, and its angle range once the angle is back up."""
+        if self._start is None:
+            self._start = timestamp
+        if self._frames == len(self._times):
+            self._grow()
+
+        i = self._frames
+        self._times[i] = timestamp - self._start
+        self._angles[i] = np.nan if angle is None else angle
+        if keypoints is None:
+            self._xy[i] = 0
+            self._conf[i] = 0
+        else:
+            self._xy[i], self._conf[i] = keypoints
+        self._frames += 1
+
+        if angle is not None:
+            self._angle_min = min(self._angle_min, angle)
+            self._angle_max = max(self._angle_max, angle)
+        if count > self._last_count:
+            if self._open_rep is not None:  # Counted again before the angle was seen back up
+                self._close_rep()
+            self._open_rep = timestamp - self._start
+            self._last_count = count
+        elif self._open_rep is not None and angle is not None and angle > self.up_angle:
+            self._close_rep()
+
+    def _close_rep(self):
+        self._rep_times.append(self._open_rep)
+        self._rep_min.append(self._angle_min)
+        self._rep_max.append(self._angle_max)
+        self._open_rep = None
+        self._angle_min, self._angle_max = np.inf, -np.inf
+
+    def encode(self):
+        """Returns the row to store: summary values plus the compressed Rep_Data and Trace_Data blobs."""
+        n = self._frames
+        # The last rep may still be open when the workout stops
+        last = [] if self._open_rep is None else [(self._open_rep, self._angle_min, self._angle_max)]
+        rep_times = np.asarray(self._rep_times + [t for t, _, _ in last], np.float64)
+        rep_min = np.asarray(self._rep_min + [low for _, low, _ in last], np.float32)
+        rep_max = np.asarray(self._rep_max + [high for _, _, high in last], np.float32)
+        rom = rep_max - rep_min
+        duration = float(self._times[n - 1]) if n else 0.0
+
+        times_ms = np.round(self._times[:n] * 1000).astype(np.int64)
+        xy = np.clip(np.round(self._xy[:n]), -32768, 32767).astype(np.int16)
+        trace = _pack(
+            time_delta_ms=np.diff(times_ms, prepend=0).astype(np.int32),
+            angle=self._angles[:n].astype(np.float16),
+            xy_delta=np.diff(xy, axis=0, prepend=np.zeros((1,) + xy.shape[1:], np.int16)),
+            conf=np.round(self._conf[:n] * 255).astype(np.uint8),
+        )
+        reps = _pack(
+            time_ms=np.round(rep_times * 1000).astype(np.int32),
+            min_angle=rep_min.astype(np.float16),
+            max_angle=rep_max.astype(np.float16),
+        )
+        tempo = float(np.diff(rep_times, prepend=0).mean()) if len(rep_times) else None
+        mean_rom = float(rom[np.isfinite(rom)].mean()) if np.isfinite(rom).any() else None
+        return {
+            "Exercise_Type": self.exercise_type,
+            "Rep_Count": len(rep_times),
+            "Frame_Count": n,
+            "Duration_S": duration,
+            "Mean_Tempo_S": tempo,
+            "Mean_ROM_Deg": mean_rom,
+            "Rep_Data": reps,
+            "Trace_Data": trace,
+        }
+
+def save_session(conn, session_id, recorder):
+    """Stores a recorder's events for a session saved in exercise_table. Returns the stored size in bytes."""
+    create_table(conn)
+    row = recorder.encode()
+    conn.execute(
+        f"INSERT OR REPLACE INTO {TABLE} (Session_ID, {', '.join(row)}) VALUES (?{', ?' * len(row)})",
+        (session_id, *row.values())
+    )
+    return len(row["Rep_Data"]) + len(row["Trace_Data"])
+
+def load_session(conn, session_id, traces=False):
+    """Decodes one session's reps (and per-frame traces if `traces` is set). Returns None if there is no log."""
+    columns = "Rep_Data, Trace_Data" if traces else "Rep_Data"
+    row = conn.execute(f"SELECT {columns} FROM {TABLE} WHERE Session_ID = ?", (session_id,)).fetchone()
+    if row is None:
+        return None
+
+    reps = _unpack(row[0])
+    session = {
+        "reps": pd.DataFrame({
+            "Time_S": reps["time_ms"] / 1000,
+            "Min_Angle": reps["min_angle"].astype(np.float32),
+            "Max_Angle": reps["max_angle"].astype(np.float32),
+        })
+    }
+    if traces:
+        trace = _unpack(row[1])
+        session["trace"] = {
+            "time_s": np.cumsum(trace["time_delta_ms"], dtype=np.int64) / 1000,
+            "angle": trace["angle"].astype(np.float32),
+            "xy": np.cumsum(trace["xy_delta"], axis=0, dtype=np.int16),
+            "conf": trace["conf"].astype(np.float32) / 255,
+        }
+    return session
+
+def aggregate_sessions(conn, exercise_type=None):
+    """Per-session summaries joined with exercise_table, computed in SQL without decoding any blob."""
+    query = f'''SELECT e.ID AS Session_ID, e.Datetime, r.Exercise_Type, r.Rep_Count, r.Duration_S,
+                       r.Mean_Tempo_S, r.Mean_ROM_Deg
+                FROM {TABLE} r JOIN exercise_table e ON e.ID = r.Session_ID'''
+    params = []
+    if exercise_type:
+        query += " WHERE r.Exercise_Type = ?"
+        params.append(exercise_type)
+    query += " ORDER BY e.Datetime"
+    return pd.read_sql_query(query, conn, params=params)
@@ -0,0 +1,104 @@
+"""Process-wide resources shared by every page and session.
+
+Streamlit re-runs a page script on every interaction, so anything expensive to build
+(database handles, LLM clients, the FAISS example index, the chatbot agent) is built
+once per process here. Heavy libraries are imported inside the functions that need
+them, so a page only pays for the features it actually uses.
+"""
+import functools
+import os
+import threading
+
+PREWARM_ENV = "VISIONFIT_PREWARM"  # Set to 1 to build resources in the background when the first page runs
+POSE_MODEL = "yolo11n-pose.pt"
+
+def _singleton(func):
+    """Builds the wrapped resource on first call and returns the same object afterwards."""
+    lock = threading.Lock()
+    built = []
+
+    @functools.wraps(func)
+    def wrapper():
+        if not built:
+            with lock:
+                if not built:
+                    built.append(func())
+        return built[0]
+    return wrapper
+
+def openai_key_configured():
+    """Copies OPENAI_KEY from .env into the variable the OpenAI clients read. Returns False if it is missing."""
+    from dotenv import load_dotenv
+    load_dotenv()
+    open_ai_key = os.getenv("OPENAI_KEY")
+    if not open_ai_key:
+        return False
+    os.environ["OPENAI_API_KEY"] = open_ai_key
+    return True
+
+@_singleton
+def sql_database():
+    """The SQL chain's view of the schema, shared by every member (see tenants.schema_db_path)."""
+    from schema_cache import open_sql_db
+    from tenants import schema_db_path
+    return open_sql_db(f"sqlite:///{schema_db_path()}")
+
+@_singleton
+def gateway():
+    from llm_gateway import get_gateway
+    return get_gateway()
+
+@_singleton
+def chat_model():
+    return gateway().chat_model(model="gpt-4o", temperature=0)
+
+@_singleton
+def gated_chat_model():
+    """chat_model() under the gateway's concurrency limit and coalescing, for direct prompts outside the agent."""
+    return gateway().wrap(chat_model())
+
+@_singleton
+def example_selector():
+    from chatbot_chain import build_example_selector
+    return build_example_selector(gateway().embeddings(model="text-embedding-3-large"))
+
+@_singleton
+def write_query():
+    from chatbot_chain import build_write_query
+    return gateway().wrap(build_write_query(chat_model(), sql_database(), example_selector()))
+
+@_singleton
+def chat_agent():
+    from chatbot_chain import build_agent
+    return build_agent(gateway(), chat_model(), write_query())
+
+@_singleton
+def pose_solutions():
+    """The ultralytics solutions module, imported once and with the pose weights downloaded.
+
+    Each AIGym still loads its own model from the weights file: the tracker keeps its
+    track state on the model, so concurrent workouts must not share one.
+    """
+    from ultralytics import solutions, YOLO
+    YOLO(POSE_MODEL)
+    return solutions
+
+def prewarm():
+    """Builds the heavy resources up front so the first user of each page does not wait for them."""
+    sql_database()
+    pose_solutions()
+    if openai_key_configured():
+        chat_agent()
+
+@_singleton
+def prewarm_in_background():
+    """Starts prewarm() once per process on a daemon thread, if VISIONFIT_PREWARM is set.
+
+    Streamlit has no server start hook, so this is called by tenants.current_user,
+    which every page runs first: the first page opened in the process starts it.
+    """
+    if os.getenv(PREWARM_ENV) != "1":
+        return None
+    thread = threading.Thread(target=prewarm, name="prewarm", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,61 @@
+import threading
+from langchain_community.utilities import SQLDatabase
+from rep_events import TABLE as REP_EVENT_TABLE
+
+class CachedSQLDatabase(SQLDatabase):
+    """SQLDatabase that builds a compact table_info once per SQLite schema version.
+
+    The stock implementation reflects the tables and queries sample rows for every
+    prompt. Here the snapshot is rebuilt only when `PRAGMA schema_version` changes,
+    which SQLite bumps on every CREATE/ALTER/DROP.
+    """
+
+    def __init__(self, *args, exclude_tables=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self._exclude_tables = set(exclude_tables)
+        self._schema_version = None
+        self._table_info_cache = {}
+        self._cache_lock = threading.Lock()
+
+    def schema_version(self):
+        with self._engine.connect() as conn:
+            return conn.exec_driver_sql("PRAGMA schema_version").scalar()
+
+    def get_table_info(self, table_names=None):
+        version = self.schema_version()
+        key = tuple(sorted(table_names)) if table_names else None
+        with self._cache_lock:
+            if version != self._schema_version:
+                self._table_info_cache.clear()
+                self._schema_version = version
+            if key not in self._table_info_cache:
+                self._table_info_cache[key] = self._compact_table_info(table_names)
+            return self._table_info_cache[key]
+
+    def _compact_table_info(self, table_names=None):
+        """One line of column definitions per table, plus a single example row for value formats."""
+        lines = []
+        with self._engine.connect() as conn:
+            if not table_names:
+                table_names = [row[0] for row in conn.exec_driver_sql(
+                    "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+                ) if row[0] not in self._exclude_tables]
+            for table in table_names:
+                quoted = '"' + table.replace('"', '""') + '"'
+                columns = []
+                for _, name, col_type, _, _, pk in conn.exec_driver_sql(f"PRAGMA table_info({quoted})"):
+                    columns.append(f"{name} {col_type}{' PRIMARY KEY' if pk else ''}".strip())
+                lines.append(f"{table}({', '.join(columns)})")
+
+                example = conn.exec_driver_sql(f"SELECT * FROM {quoted} LIMIT 1").fetchone()
+                if example is not None:
+                    lines.append("  example row: " + " | ".join(str(value) for value in example))
+        return "\n".join(lines)
+
+def open_sql_db(uri="sqlite:///exercise.db"):
+    """Opens the database for the SQL chain without reflecting tables or sampling rows up front.
+
+    The rep event log only holds binary arrays, so it is kept out of the prompt.
+    """
+    return CachedSQLDatabase.from_uri(uri, lazy_table_reflection=True, sample_rows_in_table_info=0,
+                                      exclude_tables=[REP_EVENT_TABLE])
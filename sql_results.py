@@ -0,0 +1,179 @@
+import re
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+import pandas as pd
+
+DB_PATH = "exercise.db"
+MAX_STORED_RESULTS = 20  # Oldest results are dropped once this many are held
+PREVIEW_ROWS = 10
+MAX_RESULT_ROWS = 2000  # Larger results are downsampled (or truncated) before leaving SQLite
+MAX_CHART_SERIES = 12  # Text columns with more distinct values are labels, not series to plot
+
+_results = OrderedDict()
+_lock = threading.Lock()
+
+def run_query(sql, db_path=None):
+    """Runs a read-only query on `db_path` (default DB_PATH) and keeps the result server-side. Returns (handle, DataFrame)."""
+    sql = sql.strip().rstrip(";")
+    conn = sqlite3.connect(f"file:{db_path or DB_PATH}?mode=ro", uri=True)
+    try:
+        # One bounded pass answers small results outright and gives larger ones a sample to type their columns.
+        # The SQL is wrapped with a newline before ")" so a trailing -- comment cannot swallow it.
+        cursor = conn.execute(f"SELECT * FROM ({sql}\n) LIMIT {MAX_RESULT_ROWS + 1}")
+        columns = [col[0] for col in cursor.description]
+        rows = cursor.fetchall()
+        if len(rows) <= MAX_RESULT_ROWS:
+            df = pd.DataFrame.from_records(rows, columns=columns)
+            total_rows = len(rows)
+        else:
+            df, total_rows = _downsample(conn, sql, columns, rows)
+    finally:
+        conn.close()
+
+    handle = uuid.uuid4().hex[:8]
+    df.attrs["total_rows"] = total_rows
+    with _lock:
+        _results[handle] = df
+        while len(_results) > MAX_STORED_RESULTS:
+            _results.popitem(last=False)
+    return handle, df
+
+def _parse_date(value):
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+def _first_value(rows, index):
+    """First non-NULL value of a column in the sampled rows, or None."""
+    return next((row[index] for row in rows if row[index] is not None), None)
+
+def _aggregate(sql, column):
+    """The aggregate that keeps a column's meaning when its rows are merged into one bucket.
+
+    Columns the query itself computed with SUM, COUNT, MIN, MAX or AVG are combined with
+    the matching aggregate, so totals stay totals and extremes stay extremes. Any other
+    value, such as a per-row count or a rate, is averaged.
+    """
+    quoted = re.escape(column)
+    # SQLite names an unaliased expression by its text, e.g. "SUM(Count)"
+    match = re.match(r"\s*(SUM|TOTAL|COUNT|MIN|MAX|AVG)\s*\(", column, re.IGNORECASE)
+    if match is None:
+        match = re.search(rf"\b(SUM|TOTAL|COUNT|MIN|MAX|AVG)\s*\((?:[^()]|\([^()]*\))*\)\s+AS\s+[\"'`\[]?{quoted}\b",
+                          sql, re.IGNORECASE)
+    function = match.group(1).upper() if match else "AVG"
+    return {"TOTAL": "SUM", "COUNT": "SUM"}.get(function, function)
+
+def _downsample(conn, sql, columns, sample):
+    """Aggregates an oversized result into at most MAX_RESULT_ROWS rows inside SQLite. Returns (DataFrame, total rows).
+
+    Results whose first column is a date or a number are treated as a series: rows are
+    grouped into equal-width buckets of that column, text columns are kept as series
+    keys so separate series are not merged, and each numeric column is combined with
+    the aggregate that suits it (see _aggregate). Anything else is truncated to the
+    first MAX_RESULT_ROWS rows.
+    """
+    x_axis = _quote(columns[0])
+    x_value = _first_value(sample, 0)
+    if _parse_date(x_value) is not None:
+        position = f"julianday({x_axis})"
+    elif isinstance(x_value, (int, float)):
+        position = x_axis
+    else:
+        position = None
+
+    # A column with no value in the sample is kept as a numeric column rather than dropped
+    series = [col for i, col in enumerate(columns[1:], 1) if isinstance(_first_value(sample, i), (str, bytes))]
+    values = [col for col in columns[1:] if col not in series]
+    series_key = " || char(31) || ".join(f"COALESCE({_quote(col)}, '')" for col in series) or "''"
+
+    if position is not None and values:
+        total_rows, low, high, series_count = conn.execute(
+            f"SELECT COUNT(*), MIN({position}), MAX({position}), COUNT(DISTINCT {series_key}) FROM ({sql}\n)"
+        ).fetchone()
+        buckets = MAX_RESULT_ROWS // max(series_count, 1)
+        if buckets >= 2 and low is not None:
+            width = (high - low) / buckets or 1
+            keys = "".join(f", {_quote(col)}" for col in series)
+            aggregates = ", ".join(f"{_aggregate(sql, col)}({_quote(col)}) AS {_quote(col)}" for col in values)
+            bucket_query = f"""SELECT MIN({x_axis}) AS {x_axis}{keys}, {aggregates} FROM ({sql}\n)
+                GROUP BY MIN(CAST(({position} - ?) / ? AS INTEGER), {buckets - 1}){keys}
+                ORDER BY 1"""
+            df = pd.read_sql_query(bucket_query, conn, params=(low, width))[columns]
+            df.attrs["bucketed"] = True
+            return df, total_rows
+    else:
+        total_rows = conn.execute(f"SELECT COUNT(*) FROM ({sql}\n)").fetchone()[0]
+
+    df = pd.DataFrame.from_records(sample[:MAX_RESULT_ROWS], columns=columns)
+    df.attrs["truncated"] = True
+    return df, total_rows
+
+def get_result(handle):
+    """Returns the DataFrame stored under a handle, or None if it has expired."""
+    with _lock:
+        return _results.get(handle.strip())
+
+def describe_result(handle, df):
+    """Short text summary of a stored result for the agent, instead of the full data."""
+    summary = f"Result handle: {handle}\nRows: {len(df)}\nColumns: {', '.join(df.columns)}\n"
+    total_rows = df.attrs.get("total_rows", len(df))
+    if df.attrs.get("bucketed"):
+        summary += (f"The query returned {total_rows} rows, aggregated into {len(df)} rows over equal-width buckets of "
+                    f"{df.columns[0]}: totals are summed, minimums and maximums kept, other values averaged.\n")
+    elif df.attrs.get("truncated"):
+        summary += f"The query returned {total_rows} rows, only the first {len(df)} are kept.\n"
+    if df.empty:
+        return summary + "The query returned no rows."
+    summary += df.head(PREVIEW_ROWS).to_string(index=False)
+    if len(df) > PREVIEW_ROWS:
+        summary += f"\n... {len(df) - PREVIEW_ROWS} more rows held under the handle."
+    return summary
+
+def chart_type(graph):
+    """Maps the agent's free-text graph request to 'bar', 'line' or 'table'."""
+    graph = graph.lower()
+    for kind in ("bar", "line", "table"):
+        if kind in graph:
+            return kind
+    return None
+
+def chart_frame(df):
+    """Indexes a result by its first column (the x-axis) with numeric y-axis columns.
+
+    Returns None when the result has no numeric column to plot.
+    """
+    df = df.copy()
+    x_axis = df.columns[0]
+
+    # SQLite returns dates as ISO strings, so parse them when every value is a date
+    if pd.api.types.is_object_dtype(df[x_axis]) or pd.api.types.is_string_dtype(df[x_axis]):
+        parsed = pd.to_datetime(df[x_axis], errors="coerce")
+        if parsed.notna().all():
+            df[x_axis] = parsed
+
+    numeric = {col: pd.to_numeric(df[col], errors="coerce") for col in df.columns[1:]}
+    values = [col for col, parsed in numeric.items() if parsed.notna().any()]
+    if not values:
+        return None
+    # A text column with a few distinct values names separate series (e.g. one line per exercise type), so it is
+    # spread into columns; one with many, like a timestamp, is a label and left out
+    series = [col for col in df.columns[1:] if col not in values and 0 < df[col].nunique() <= MAX_CHART_SERIES]
+    for col in values:
+        df[col] = numeric[col]
+    df = df[[x_axis, *series, *values]]
+    if not series:
+        return df.set_index(x_axis)
+
+    wide = df.groupby([x_axis, *series])[values].first().unstack(series)  # Same as pivot_table, at half the cost
+    names = wide.columns.to_flat_index()
+    wide.columns = [" / ".join(str(part) for part in (name[1:] if len(values) == 1 else name)) for name in names]
+    return wide
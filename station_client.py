@@ -0,0 +1,176 @@
+"""Capture station client: streams pose keypoints to the ingest server.
+
+Frames stay in an unacknowledged window until the server confirms them. While the
+connection is down, or the window is full, send_frame waits (backpressure). After a
+drop the client reconnects with backoff, resumes the same session, and replays every
+frame the server has not seen yet.
+
+Run from the repository root, on a machine with a webcam:
+    python -m station_client --server 192.168.1.10:8770 --exercise Squat --email alice@example.com
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from collections import deque
+import numpy as np
+from keypoint_protocol import (ACK_EVERY, WELCOME, ACK, SAVED, ProtocolError, decode, read_message,
+                               encode_hello, encode_frame, encode_end)
+from rep_counter import keypoints_dict
+import tenants
+
+MAX_UNACKED = 300  # Frames buffered for replay, about ten seconds at 30 fps
+MAX_BACKOFF = 5.0
+
+class StationClient:
+    def __init__(self, host, port, exercise_type, max_unacked=MAX_UNACKED, user_id=tenants.DEFAULT_USER):
+        if max_unacked < ACK_EVERY:
+            # The server only acknowledges every ACK_EVERY frames, so a smaller window never drains
+            raise ValueError(f"max_unacked must be at least {ACK_EVERY}")
+        self.host = host
+        self.port = port
+        self.user_id = tenants.validate_user(user_id)
+        self.exercise_type = exercise_type
+        self.num_joints = len(keypoints_dict[exercise_type])
+        self.max_unacked = max_unacked
+        self.token = uuid.uuid4().bytes
+        self.bytes_sent = 0
+        self.reconnects = 0
+        self._seq = 0
+        self._unacked = deque()  # (seq, encoded frame)
+        self._end = None
+        self._writer = None
+        self._connected = False
+        self._window = asyncio.Condition()
+        self._saved = None
+        self._task = None
+
+    async def start(self):
+        self._saved = asyncio.get_running_loop().create_future()
+        self._task = asyncio.create_task(self._run())
+
+    def _write(self, data):
+        self._writer.write(data)
+        self.bytes_sent += len(data)
+
+    async def _run(self):
+        backoff = 0.1
+        while not self._saved.done():
+            try:
+                reader, self._writer = await asyncio.open_connection(self.host, self.port)
+                self._write(encode_hello(self.exercise_type, self.num_joints, self.token, self.user_id))
+                kind, welcome = decode(await read_message(reader))
+                if kind != WELCOME:
+                    raise ConnectionError("Expected WELCOME")
+                await self._acknowledge(welcome["seq"])
+
+                # Replay everything the server has not seen; no await until caught up, so
+                # frames added meanwhile by send_frame are not sent twice or out of order
+                for _, frame in self._unacked:
+                    self._write(frame)
+                if self._end is not None:
+                    self._write(self._end)
+                self._connected = True
+                await self._writer.drain()
+                backoff = 0.1
+
+                while True:
+                    kind, message = decode(await read_message(reader))
+                    if kind == ACK:
+                        await self._acknowledge(message["seq"])
+                    elif kind == SAVED:
+                        self._saved.set_result((message["session_id"], message["count"]))
+                        break
+            except (OSError, asyncio.IncompleteReadError, ProtocolError) as e:
+                if isinstance(e, ProtocolError):
+                    print(f"Reconnecting after a malformed server message: {e}")
+                self.reconnects += 1
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+            finally:
+                self._connected = False
+                if self._writer is not None:
+                    self._writer.close()
+                    self._writer = None
+
+    async def _acknowledge(self, seq):
+        async with self._window:
+            while self._unacked and self._unacked[0][0] <= seq:
+                self._unacked.popleft()
+            self._window.notify_all()
+
+    async def send_frame(self, time_ms, people):
+        """Queues one frame of keypoints, shape (people, joints, 3), and sends it if connected.
+
+        Waits while `max_unacked` frames are still unconfirmed by the server.
+        """
+        async with self._window:
+            await self._window.wait_for(lambda: len(self._unacked) < self.max_unacked)
+        self._seq += 1
+        frame = encode_frame(self._seq, time_ms, people)
+        self._unacked.append((self._seq, frame))
+        if self._connected:
+            try:
+                self._write(frame)
+                await self._writer.drain()
+            except (OSError, AttributeError):
+                pass  # _run notices the drop, reconnects and replays the frame
+
+    async def finish(self, timeout=None):
+        """Ends the workout and waits until the server has saved it. Returns (session_id, count)."""
+        self._end = encode_end(self._seq)
+        if self._connected:
+            try:
+                self._write(self._end)
+                await self._writer.drain()
+            except (OSError, AttributeError):
+                pass
+        return await asyncio.wait_for(asyncio.shield(self._saved), timeout)
+
+async def stream_webcam(host, port, exercise_type, camera=0, user_id=tenants.DEFAULT_USER):
+    """Runs pose inference on a local webcam and streams the exercise joints until Ctrl+C."""
+    import cv2
+    from resources import POSE_MODEL
+    from ultralytics import YOLO
+
+    model = YOLO(POSE_MODEL)
+    joints = keypoints_dict[exercise_type]
+    client = StationClient(host, port, exercise_type, user_id=user_id)
+    await client.start()
+    cap = cv2.VideoCapture(camera)
+    start = time.monotonic()
+    try:
+        while cap.isOpened():
+            success, frame = await asyncio.to_thread(cap.read)
+            if not success:
+                break
+            result = (await asyncio.to_thread(model.track, frame, persist=True, verbose=False))[0]
+            if result.keypoints is None or result.boxes.id is None:
+                people = np.zeros((0, len(joints), 3), np.float32)
+            else:
+                # Same person order AIGym counts in
+                people = result.keypoints.data[:, joints].cpu().numpy()[::-1]
+            await client.send_frame(int((time.monotonic() - start) * 1000), people)
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    finally:
+        cap.release()
+    session_id, count = await client.finish()
+    print(f"Saved workout {session_id}: {count} {exercise_type}s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--server", default="127.0.0.1:8770", help="ingest server host:port")
+    parser.add_argument("--exercise", choices=list(keypoints_dict), default="Squat")
+    parser.add_argument("--camera", type=int, default=0)
+    member = parser.add_mutually_exclusive_group()
+    member.add_argument("--email", help="email the member signs in to the app with")
+    member.add_argument("--user", default=tenants.DEFAULT_USER, help="member ID, when the app has no sign-in")
+    args = parser.parse_args()
+    user_id = tenants.member_for_email(args.email) if args.email else args.user
+
+    host, port = args.server.rsplit(":", 1)
+    asyncio.run(stream_webcam(host, int(port), args.exercise, args.camera, user_id))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Per-member storage: one SQLite database and one photos folder for each member.
+
+Each member's workouts live in their own file, so one member's writes never lock
+another's, and a query scans only that member's rows however many members there are.
+The default member keeps the original exercise.db and Photos folder, so single-user
+installs work unchanged; every other member gets tenants/<user_id>/. Signed-in members
+are identified by a hash of their email (member_for_email).
+
+Open connections are kept in a bounded LRU. The least recently used idle handle is
+closed once more than MAX_OPEN_DBS are open.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from rep_events import create_table as create_rep_event_table
+
+DEFAULT_USER = "default"
+DEFAULT_DB_PATH = "exercise.db"
+DEFAULT_PHOTOS_FOLDER = "Photos"
+TENANTS_FOLDER = "tenants"
+SCHEMA_DB_PATH = "schema.db"  # Outside TENANTS_FOLDER, so no member ID can collide with it
+MAX_OPEN_DBS = 64
+MEMBER_PICKER_ENV = "VISIONFIT_MEMBER_PICKER"
+
+_USER_ID = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.@+-]{0,63}")
+
+def validate_user(user_id):
+    """Returns `user_id` if it is safe to use as a folder name, else raises ValueError."""
+    if not isinstance(user_id, str) or not _USER_ID.fullmatch(user_id):
+        raise ValueError(f"Invalid member ID {user_id!r}: use up to 64 letters, digits and _.@+-")
+    return user_id
+
+def member_for_email(email):
+    """The member ID of a signed-in user: a hash of their email, safe as a folder name whatever the address."""
+    return "u" + hashlib.sha256(email.strip().lower().encode()).hexdigest()[:32]
+
+def db_path(user_id=DEFAULT_USER):
+    if validate_user(user_id) == DEFAULT_USER:
+        return DEFAULT_DB_PATH
+    return os.path.join(TENANTS_FOLDER, user_id, "exercise.db")
+
+def photos_dir(user_id=DEFAULT_USER):
+    if validate_user(user_id) == DEFAULT_USER:
+        return DEFAULT_PHOTOS_FOLDER
+    return os.path.join(TENANTS_FOLDER, user_id, "Photos")
+
+def create_schema(conn):
+    """Creates the tables every member database has. Safe to call on an existing database."""
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")  # Takes effect for a new database file
+    conn.execute("PRAGMA journal_mode = WAL")  # Readers are not blocked while deletion jobs write
+    conn.execute('''CREATE TABLE IF NOT EXISTS exercise_table (
+                        ID INTEGER PRIMARY KEY AUTOINCREMENT,
+                        Datetime DATETIME,
+                        Count INTEGER,
+                        Exercise_Type TEXT)''')
+    create_rep_event_table(conn)
+    conn.commit()
+
+def schema_db_path():
+    """A database with the member schema and one made-up example row, for the SQL chain's prompt.
+
+    Every member shares the schema, so the chatbot builds its prompt from this file
+    instead of from any real member's data.
+    """
+    if not os.path.exists(SCHEMA_DB_PATH):
+        conn = sqlite3.connect(SCHEMA_DB_PATH)
+        try:
+            create_schema(conn)
+            if conn.execute("SELECT COUNT(*) FROM exercise_table").fetchone()[0] == 0:
+                conn.execute("INSERT INTO exercise_table (Datetime, Count, Exercise_Type) VALUES (?, ?, ?)",
+                             ("2024-05-01 18:30:00.000000", 20, "Squat"))
+                conn.commit()
+        finally:
+            conn.close()
+    return SCHEMA_DB_PATH
+
+class _Handle:
+    def __init__(self, conn):
+        self.conn = conn
+        self.lock = threading.Lock()  # Serialises use of the connection across script threads
+        self.users = 0  # Callers holding the handle; it is only closed when this is 0
+
+class TenantStore:
+    """Bounded LRU of open member databases, created with the schema on first use."""
+
+    def __init__(self, max_open=MAX_OPEN_DBS):
+        self.max_open = max_open
+        self._handles = OrderedDict()  # user_id -> _Handle, least recently used first
+        self._lock = threading.Lock()
+
+    def _open(self, user_id):
+        path = db_path(user_id)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        create_schema(conn)
+        return _Handle(conn)
+
+    def _evict(self):
+        for user_id, handle in list(self._handles.items()):
+            if len(self._handles) <= self.max_open:
+                return
+            if handle.users == 0:
+                del self._handles[user_id]
+                handle.conn.close()
+
+    @contextmanager
+    def connection(self, user_id=DEFAULT_USER):
+        """Yields the member's connection. Commits when the block succeeds and rolls back when it raises."""
+        validate_user(user_id)
+        with self._lock:
+            handle = self._handles.get(user_id)
+            if handle is None:
+                handle = self._handles[user_id] = self._open(user_id)
+            self._handles.move_to_end(user_id)
+            handle.users += 1
+            self._evict()
+        try:
+            with handle.lock:
+                try:
+                    yield handle.conn
+                except BaseException:
+                    handle.conn.rollback()
+                    raise
+                handle.conn.commit()
+        finally:
+            with self._lock:
+                handle.users -= 1
+                self._evict()
+
+    def open_count(self):
+        with self._lock:
+            return len(self._handles)
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    """Returns the process-wide tenant store, creating it on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = TenantStore()
+        return _store
+
+def connection(user_id=DEFAULT_USER):
+    """Shorthand for get_store().connection(user_id)."""
+    return get_store().connection(user_id)
+
+def ensure_db(user_id=DEFAULT_USER):
+    """Creates the member's database if needed and returns its path, for code that opens its own connections."""
+    with connection(user_id):
+        pass
+    return db_path(user_id)
+
+def _auth_configured(st):
+    try:
+        return "auth" in st.secrets
+    except FileNotFoundError:  # No secrets file at all
+        return False
+
+def current_user():
+    """The member whose data the page shows.
+
+    With Streamlit authentication configured, that is the signed-in user, and the page
+    stops at a login button until someone signs in. Without it the app is single-user
+    and everything belongs to the default member, unless VISIONFIT_MEMBER_PICKER=1
+    turns on the sidebar member picker. The picker lets whoever uses the app act as any
+    member, so it is only for development and trusted single-machine setups.
+    """
+    import streamlit as st
+    import resources
+    resources.prewarm_in_background()  # Every page starts here, whichever one is opened first
+
+    if st.user.get("is_logged_in") and st.user.get("email"):
+        return member_for_email(st.user.email)
+    if _auth_configured(st):
+        st.info("Sign in to see your workouts.")
+        st.button("Log in", on_click=st.login)
+        st.stop()
+    if os.environ.get(MEMBER_PICKER_ENV) != "1":
+        return DEFAULT_USER
+
+    user_id = st.sidebar.text_input("👤 Member", value=st.session_state.get("user_id", DEFAULT_USER)).strip()
+    try:
+        validate_user(user_id)
+    except ValueError as e:
+        st.sidebar.error(str(e))
+        user_id = st.session_state.get("user_id", DEFAULT_USER)
+    st.session_state.user_id = user_id
+    return user_id
@@ -0,0 +1,39 @@
+"""The tracker page's per-frame bookkeeping, shared with the rep counting benchmark.
+
+Everything the page does with a frame apart from reading it and running the model:
+scoring it for the snapshot, recording the rep event log, and keeping the best recent
+frame each time a rep completes.
+"""
+import numpy as np
+from frame_buffers import FrameRing
+from rep_events import RepRecorder
+
+class WorkoutLoop:
+    """Per-workout state. Frames are read through `ring`, then passed to `step`."""
+
+    def __init__(self, workout_type, num_joints=3):
+        self.ring = FrameRing()
+        self.recorder = RepRecorder(workout_type, num_joints=num_joints)
+        self.count = 0
+        self.best_frame = None
+        self.best_score = -1.0
+
+    def step(self, counter, keypoints, timestamp):
+        """Handles the frame read last, after `counter` (AIGym or RepCounter) has seen it. Returns the count.
+
+        `keypoints` is (xy, confidence) of the counted person, or None if nobody was detected.
+        """
+        self.ring.score(float(keypoints[1].mean()) if keypoints is not None else 0.0)
+        count = counter.count[0] if counter.count else 0
+        self.recorder.add_frame(timestamp, count, counter.angle[0] if counter.angle else None, keypoints)
+
+        # When a rep completes, keep the most confident recent frame if it beats the best so far
+        if count > self.count:
+            candidate, score = self.ring.best()
+            if score > self.best_score:
+                if self.best_frame is None or self.best_frame.shape != candidate.shape:
+                    self.best_frame = np.empty_like(candidate)
+                np.copyto(self.best_frame, candidate)
+                self.best_score = score
+        self.count = count
+        return count